@@ -1,10 +1,23 @@
 import aiohttp
 from aiohttp import ClientResponseError
 
+from api.client import get_client
+from api.json_codec import read_json
 from api.next_data import get_build_id, reset_build_id
 from api.rate_limiter import throttle
 
 
+def _response_cookie(resp, name: str) -> str | None:
+    for r in [resp, *getattr(resp, "history", ())]:
+        try:
+            c = r.cookies.get(name)
+        except Exception:
+            c = None
+        if c is not None:
+            return c.value
+    return None
+
+
 async def fetch_homepage_data(session_cookie: str, my_games_cookie: str | None = None) -> dict:
     headers = {
         "accept": "*/*",
@@ -17,45 +30,33 @@ async def fetch_homepage_data(session_cookie: str, my_games_cookie: str | None =
     if my_games_cookie:
         cookies["starvell.my_games"] = my_games_cookie
     timeout = aiohttp.ClientTimeout(total=20)
+    client = get_client()
     last_error = None
     data = None
     sid_cookie = None
+    my_games_from_cookie = None
     for attempt in range(2):
         build_id = await get_build_id(session_cookie)
-        url = f"https://starvell.com/_next/data/{build_id}/index.json"
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-            try:
-                await throttle()
-                async with session.get(url) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-            except ClientResponseError as exc:
-                last_error = exc
-                if exc.status == 404 and attempt == 0:
-                    reset_build_id()
-                    continue
-                raise
-            try:
-                jar_cookies = session.cookie_jar.filter_cookies("https://starvell.com")
-                c = jar_cookies.get("sid")
-                if c is not None:
-                    sid_cookie = c.value
-            except Exception:
-                sid_cookie = None
-            break
+        try:
+            await throttle()
+            async with client.get(f"/_next/data/{build_id}/index.json", headers=headers, cookies=cookies, timeout=timeout) as resp:
+                resp.raise_for_status()
+                data = await read_json(resp, "index")
+                sid_cookie = _response_cookie(resp, "sid")
+                my_games_from_cookie = _response_cookie(resp, "starvell.my_games")
+        except ClientResponseError as exc:
+            last_error = exc
+            if exc.status == 404 and attempt == 0:
+                reset_build_id(build_id)
+                continue
+            raise
+        last_error = None
+        break
     if last_error:
         raise last_error
     if data is None:
         raise RuntimeError("Unable to fetch homepage data")
     page_props = data.get("pageProps", {})
-    my_games_from_cookie = None
-    try:
-        jar_cookies = session.cookie_jar.filter_cookies("https://starvell.com")
-        c_mg = jar_cookies.get("starvell.my_games")
-        if c_mg is not None:
-            my_games_from_cookie = c_mg.value
-    except Exception:
-        my_games_from_cookie = None
 
     result = {
         "authorized": bool(page_props.get("user")),
@@ -68,5 +69,3 @@ async def fetch_homepage_data(session_cookie: str, my_games_cookie: str | None =
         "__N_SSP": data.get("__N_SSP"),
     }
     return result
-
-
@@ -1,11 +1,18 @@
 import aiohttp
 from aiohttp import ClientResponseError
 
+from api.client import get_client
+from api.conditional import PollValidator
+from api.json_codec import decode, read_json
 from api.next_data import get_build_id, reset_build_id
 from api.rate_limiter import throttle
 
 
-async def fetch_chats(session_cookie: str, my_games_cookie: str | None = None) -> dict:
+async def fetch_chats(
+    session_cookie: str,
+    my_games_cookie: str | None = None,
+    validator: PollValidator | None = None,
+) -> dict | None:
     headers = {
         "accept": "*/*",
         "accept-language": "ru,en;q=0.9",
@@ -17,22 +24,27 @@ async def fetch_chats(session_cookie: str, my_games_cookie: str | None = None) -
     if my_games_cookie:
         cookies["starvell.my_games"] = my_games_cookie
     timeout = aiohttp.ClientTimeout(total=20)
+    client = get_client()
     last_exc = None
     for attempt in range(2):
         build_id = await get_build_id(session_cookie)
-        url = f"https://starvell.com/_next/data/{build_id}/chat.json"
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-            try:
-                await throttle()
-                async with session.get(url) as resp:
-                    resp.raise_for_status()
-                    return await resp.json()
-            except ClientResponseError as exc:
-                last_exc = exc
-                if exc.status == 404 and attempt == 0:
-                    reset_build_id()
-                    continue
-                raise
+        try:
+            await throttle()
+            request_headers = {**headers, **validator.headers()} if validator is not None else headers
+            async with client.get(f"/_next/data/{build_id}/chat.json", headers=request_headers, cookies=cookies, timeout=timeout) as resp:
+                resp.raise_for_status()
+                if validator is None:
+                    return await read_json(resp, "chats", select=("chats", "user"))
+                raw = b"" if resp.status == 304 else await resp.read()
+                if validator.observe(resp.status, resp.headers, raw):
+                    return None
+                return await decode(raw, "chats", select=("chats", "user"))
+        except ClientResponseError as exc:
+            last_exc = exc
+            if exc.status == 404 and attempt == 0:
+                reset_build_id(build_id)
+                continue
+            raise
     if last_exc:
         raise last_exc
     raise RuntimeError("Unable to fetch chat list")
@@ -0,0 +1,113 @@
+import asyncio
+import os
+
+import aiohttp
+
+
+STARVELL_BASE_URL = "https://starvell.com"
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        v = int(raw)
+    except Exception:
+        return default
+    if v < 0:
+        return default
+    return v
+
+
+class StarvellHTTPError(RuntimeError):
+    def __init__(self, status: int, text: str) -> None:
+        super().__init__(f"HTTP {status}: {text}")
+        self.status = status
+
+
+class StarvellClient:
+    def __init__(
+        self,
+        base_url: str | None = None,
+        limit: int | None = None,
+        limit_per_host: int | None = None,
+        dns_cache_ttl: int | None = None,
+        keepalive_timeout: float | None = None,
+        timeout: float = 20,
+    ) -> None:
+        self.base_url = (base_url or os.getenv("STARVELL_BASE_URL", "").strip() or STARVELL_BASE_URL).rstrip("/")
+        self.limit = limit if limit is not None else _env_int("STARVELL_POOL_LIMIT", 10)
+        self.limit_per_host = limit_per_host if limit_per_host is not None else _env_int("STARVELL_POOL_LIMIT_PER_HOST", 6)
+        self.dns_cache_ttl = dns_cache_ttl if dns_cache_ttl is not None else _env_int("STARVELL_DNS_CACHE_TTL", 300)
+        self.keepalive_timeout = float(
+            keepalive_timeout if keepalive_timeout is not None else _env_int("STARVELL_KEEPALIVE_TIMEOUT", 60)
+        )
+        self.timeout = float(timeout)
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        if not path.startswith("/"):
+            path = "/" + path
+        return self.base_url + path
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl or None,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._loop = loop
+        return self._session
+
+    def request(self, method: str, path: str, **kwargs):
+        return self._ensure_session().request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    async def close(self) -> None:
+        session = self._session
+        self._session = None
+        self._loop = None
+        if session is not None and not session.closed:
+            await session.close()
+
+
+_client: StarvellClient | None = None
+
+
+def get_client() -> StarvellClient:
+    global _client
+    if _client is None:
+        _client = StarvellClient()
+    return _client
+
+
+def set_client(client: StarvellClient | None) -> None:
+    global _client
+    _client = client
+
+
+async def close_client() -> None:
+    global _client
+    client = _client
+    _client = None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,98 @@
+import hashlib
+
+
+def body_digest(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class PollValidator:
+    __slots__ = (
+        "name",
+        "owner",
+        "etag",
+        "last_modified",
+        "digest",
+        "_pending",
+        "polls",
+        "unchanged",
+        "not_modified",
+    )
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.owner: str | None = None
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.digest: str | None = None
+        self._pending: tuple[str | None, str | None, str] | None = None
+        self.polls = 0
+        self.unchanged = 0
+        self.not_modified = 0
+
+    def bind(self, owner: str) -> "PollValidator":
+        key = body_digest(owner.encode("utf-8"))
+        if key != self.owner:
+            self.owner = key
+            self.reset()
+        return self
+
+    def reset(self) -> None:
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self._pending = None
+
+    def headers(self) -> dict[str, str]:
+        out: dict[str, str] = {}
+        if self.etag:
+            out["if-none-match"] = self.etag
+        if self.last_modified:
+            out["if-modified-since"] = self.last_modified
+        return out
+
+    def observe(self, status: int, headers, raw: bytes | None) -> bool:
+        self.polls += 1
+        if status == 304 and self.digest is not None:
+            self.unchanged += 1
+            self.not_modified += 1
+            return True
+        digest = body_digest(raw or b"")
+        if digest == self.digest:
+            self.unchanged += 1
+            return True
+        self._pending = (headers.get("ETag"), headers.get("Last-Modified"), digest)
+        return False
+
+    def commit(self) -> None:
+        if self._pending is None:
+            return
+        self.etag, self.last_modified, self.digest = self._pending
+        self._pending = None
+
+    def unchanged_rate(self) -> float:
+        return (self.unchanged / self.polls) if self.polls else 0.0
+
+    def metrics(self) -> dict:
+        return {
+            "polls": self.polls,
+            "unchanged": self.unchanged,
+            "not_modified": self.not_modified,
+            "unchanged_rate": round(self.unchanged_rate(), 3),
+            "etag": bool(self.etag),
+            "last_modified": bool(self.last_modified),
+        }
+
+
+_validators: dict[str, PollValidator] = {}
+
+
+def get_validator(name: str) -> PollValidator:
+    validator = _validators.get(name)
+    if validator is None:
+        validator = PollValidator(name)
+        _validators[name] = validator
+    return validator
+
+
+def poll_metrics() -> dict:
+    return {name: v.metrics() for name, v in sorted(_validators.items())}
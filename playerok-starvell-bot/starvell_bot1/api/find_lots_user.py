@@ -1,6 +1,9 @@
 import aiohttp
 from aiohttp import ClientResponseError
 
+from api.client import get_client
+from api.json_codec import read_json
+from api.models import Lot
 from api.next_data import get_build_id, reset_build_id
 from api.rate_limiter import throttle
 
@@ -34,24 +37,24 @@ async def find_user_lots(
         cookies["sid"] = sid_cookie
 
     timeout = aiohttp.ClientTimeout(total=20)
+    client = get_client()
     last_exc = None
     data = None
     for attempt in range(2):
         build_id = await get_build_id(session_cookie)
-        url = f"https://starvell.com/_next/data/{build_id}/users/{user_id}.json?user_id={user_id}"
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-            try:
-                await throttle()
-                async with session.get(url) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    break
-            except ClientResponseError as exc:
-                last_exc = exc
-                if exc.status == 404 and attempt == 0:
-                    reset_build_id()
-                    continue
-                raise
+        url = f"/_next/data/{build_id}/users/{user_id}.json?user_id={user_id}"
+        try:
+            await throttle()
+            async with client.get(url, headers=headers, cookies=cookies, timeout=timeout) as resp:
+                resp.raise_for_status()
+                data = await read_json(resp, "user_profile", select=("userProfileOffers", "bff", "categoriesWithOffers"))
+                break
+        except ClientResponseError as exc:
+            last_exc = exc
+            if exc.status == 404 and attempt == 0:
+                reset_build_id(build_id)
+                continue
+            raise
 
     if data is None and last_exc:
         raise last_exc
@@ -64,7 +67,7 @@ async def find_user_lots(
     if not user_profile_offers:
         user_profile_offers = (page_props.get("bff") or {}).get("userProfileOffers")
 
-    lots: list[dict] = []
+    lots: list[Lot] = []
 
     categories = user_profile_offers or page_props.get("categoriesWithOffers") or []
     if not isinstance(categories, list):
@@ -90,26 +93,7 @@ async def find_user_lots(
         for offer in offers:
             if not isinstance(offer, dict):
                 continue
-            offer_id = _maybe_int(offer.get("id"))
-            price = offer.get("price")
-            availability = offer.get("availability")
-            brief = (
-                (offer.get("descriptions") or {}).get("rus", {}).get("briefDescription")
-                or (offer.get("descriptions") or {}).get("rus", {}).get("description")
-            )
-            title = str(brief).strip() if brief else None
-            lots.append(
-                {
-                    "id": offer_id,
-                    "title": title,
-                    "availability": availability,
-                    "price": price,
-                    "url": f"https://starvell.com/offers/{offer_id}" if offer_id else None,
-                    "category_id": category_id,
-                    "game_id": game_id,
-                    "category_url": category_url,
-                }
-            )
+            lots.append(Lot.from_offer(offer, category_id, game_id, category_url))
 
     derived_my_games = None
     if seen_game_ids:
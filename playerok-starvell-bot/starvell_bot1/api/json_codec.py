@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name, "").strip()
+    try:
+        v = int(raw) if raw else default
+    except Exception:
+        return default
+    return v if v >= 0 else default
+
+
+OFFLOOP_BYTES: int = _env_int("STARVELL_JSON_OFFLOOP_BYTES", 256 * 1024)
+
+
+def _pick_backend(name: str) -> tuple[str, Callable[[bytes], Any]]:
+    name = (name or "auto").strip().lower()
+    if name in ("auto", "orjson") and orjson is not None:
+        return "orjson", orjson.loads
+    if name in ("auto", "msgspec") and msgspec is not None:
+        return "msgspec", msgspec.json.decode
+    if name not in ("auto", "json", "stdlib"):
+        logging.getLogger("exfador.api").warning(f"json_backend_unavailable backend={name} fallback=json")
+    return "json", json.loads
+
+
+BACKEND, _loads = _pick_backend(os.getenv("STARVELL_JSON_BACKEND", "auto"))
+
+
+def set_backend(name: str) -> str:
+    global BACKEND, _loads
+    BACKEND, _loads = _pick_backend(name)
+    _selective.clear()
+    return BACKEND
+
+
+def loads(raw: bytes | str) -> Any:
+    return _loads(raw)
+
+
+_selective: dict[tuple[str, ...], Callable[[bytes], Any]] = {}
+
+
+def _selective_decoder(keys: tuple[str, ...]) -> Callable[[bytes], Any]:
+    decoder = _selective.get(keys)
+    if decoder is not None:
+        return decoder
+    if BACKEND == "msgspec":
+        props = msgspec.defstruct("PageProps", [(k, Any, None) for k in keys])
+        envelope = msgspec.defstruct("NextData", [("pageProps", props | None, None)])
+        typed = msgspec.json.Decoder(envelope)
+
+        def decoder(raw: bytes) -> Any:
+            try:
+                obj = typed.decode(raw)
+            except msgspec.ValidationError:
+                return _loads(raw)
+            page_props = obj.pageProps
+            if page_props is None:
+                return {"pageProps": {}}
+            return {"pageProps": {k: getattr(page_props, k) for k in keys if getattr(page_props, k) is not None}}
+
+    else:
+
+        def decoder(raw: bytes) -> Any:
+            obj = _loads(raw)
+            page_props = (obj or {}).get("pageProps") if isinstance(obj, dict) else None
+            if not isinstance(page_props, dict):
+                return obj
+            return {"pageProps": {k: page_props[k] for k in keys if k in page_props}}
+
+    _selective[keys] = decoder
+    return decoder
+
+
+class _DecodeStats:
+    __slots__ = ("count", "bytes", "seconds", "max_seconds", "offloop")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.offloop = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "bytes": self.bytes,
+            "avg_ms": round(self.seconds * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "offloop": self.offloop,
+        }
+
+
+_stats: dict[str, _DecodeStats] = {}
+
+
+def _timed(decoder: Callable[[bytes], Any], raw: bytes) -> tuple[Any, float]:
+    started = time.perf_counter()
+    obj = decoder(raw)
+    return obj, time.perf_counter() - started
+
+
+async def decode(raw: bytes, endpoint: str = "other", select: tuple[str, ...] | None = None) -> Any:
+    decoder = _selective_decoder(tuple(select)) if select else _loads
+    offloop = len(raw) >= OFFLOOP_BYTES > 0
+    if offloop:
+        obj, elapsed = await asyncio.to_thread(_timed, decoder, raw)
+    else:
+        obj, elapsed = _timed(decoder, raw)
+    stats = _stats.get(endpoint)
+    if stats is None:
+        stats = _DecodeStats()
+        _stats[endpoint] = stats
+    stats.count += 1
+    stats.bytes += len(raw)
+    stats.seconds += elapsed
+    stats.max_seconds = max(stats.max_seconds, elapsed)
+    if offloop:
+        stats.offloop += 1
+    return obj
+
+
+async def read_json(resp, endpoint: str = "other", select: tuple[str, ...] | None = None) -> Any:
+    return await decode(await resp.read(), endpoint, select)
+
+
+def json_metrics() -> dict:
+    return {
+        "backend": BACKEND,
+        "offloop_bytes": OFFLOOP_BYTES,
+        "endpoints": {k: v.as_dict() for k, v in sorted(_stats.items())},
+    }
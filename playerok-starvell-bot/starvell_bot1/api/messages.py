@@ -1,5 +1,7 @@
 import aiohttp
 
+from api.client import get_client
+from api.json_codec import read_json
 from api.rate_limiter import throttle
 
 
@@ -22,13 +24,12 @@ async def fetch_chat_messages(
         cookies["starvell.my_games"] = my_games_cookie
     payload = {"chatId": chat_id, "limit": limit}
     timeout = aiohttp.ClientTimeout(total=20)
-    url = "https://starvell.com/api/messages/list"
-    async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-        await throttle()
-        async with session.post(url, json=payload) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            if isinstance(data, list):
-                return data
-            return []
+    client = get_client()
+    await throttle()
+    async with client.post("/api/messages/list", json=payload, headers=headers, cookies=cookies, timeout=timeout) as resp:
+        resp.raise_for_status()
+        data = await read_json(resp, "chat_messages")
+        if isinstance(data, list):
+            return data
+        return []
 
@@ -0,0 +1,251 @@
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+
+
+def parse_created_at(ts) -> int | None:
+    if not ts or not isinstance(ts, str):
+        return None
+    try:
+        if ts.endswith("Z"):
+            ts = ts[:-1] + "+00:00"
+        dt = datetime.fromisoformat(ts)
+        if dt.tzinfo is None:
+            dt = dt.astimezone()
+        return int(dt.astimezone(timezone.utc).timestamp())
+    except Exception:
+        return None
+
+
+def normalize_id(value) -> str | None:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, str)):
+        return str(value).strip()
+    return None
+
+
+def fmt_minor_rub(v) -> str:
+    if type(v) is int:
+        return f"{v/100:.2f}"
+    try:
+        iv = int(v)
+        return f"{iv/100:.2f}"
+    except Exception:
+        try:
+            fv = float(v)
+            return f"{fv/100:.2f}"
+        except Exception:
+            return "0.00"
+
+
+def _maybe_int(v) -> int | None:
+    try:
+        return int(v)
+    except Exception:
+        return None
+
+
+def _rus_text(obj: dict) -> str:
+    desc_rus = (obj.get("descriptions") or {}).get("rus") or {}
+    return str(desc_rus.get("briefDescription") or "").strip() or str(desc_rus.get("description") or "").strip()
+
+
+def _image_preview_url(img: dict) -> str | None:
+    try:
+        img_id = str((img or {}).get("id") or "").strip()
+        ext = str((img or {}).get("extension") or "png").strip().lstrip(".")
+        if not img_id:
+            return None
+        return f"https://cdn.starvell.com/messages/{img_id}-preview.{ext or 'png'}"
+    except Exception:
+        return None
+
+
+class Order(NamedTuple):
+    id: str
+    status: str
+    quantity: int
+    price_rub: str
+    buyer: str
+    game: str
+    category: str
+    raw: Any
+
+    @classmethod
+    def parse(cls, order: dict) -> "Order":
+        get = order.get
+        user = get("user") or {}
+        offer = get("offerDetails") or {}
+        quantity = get("quantity") or 1
+        if type(quantity) is not int:
+            quantity = _maybe_int(quantity) or 1
+        return tuple.__new__(
+            cls,
+            (
+                str(get("id") or ""),
+                str(get("status") or ""),
+                quantity,
+                fmt_minor_rub(get("basePrice") or get("totalPrice") or 0),
+                user.get("username") or str(user.get("id") or "-"),
+                (offer.get("game") or {}).get("name") or "-",
+                (offer.get("category") or {}).get("name") or "-",
+                order,
+            ),
+        )
+
+    @property
+    def buyer_id(self) -> str | None:
+        return normalize_id((self.raw.get("user") or {}).get("id"))
+
+    @property
+    def offer_name(self) -> str:
+        offer = self.raw.get("offerDetails") or {}
+        return (
+            _rus_text(offer)
+            or str((offer.get("offer") or {}).get("name") or "").strip()
+            or str(offer.get("name") or "").strip()
+            or str(offer.get("title") or "").strip()
+        )
+
+    @property
+    def product(self) -> str:
+        offer = self.raw.get("offerDetails") or {}
+        parts: list[str] = []
+        sub_category = ((offer.get("subCategory") or {}).get("name") or "").strip()
+        if sub_category:
+            parts.append(sub_category)
+        attr_values: list[str] = []
+        for attr in offer.get("attributes") or []:
+            try:
+                value = (attr or {}).get("value") or {}
+                name_ru = str(value.get("nameRu") or value.get("name") or "").strip()
+                if name_ru:
+                    attr_values.append(name_ru)
+            except Exception:
+                continue
+        if attr_values:
+            parts.append(", ".join(attr_values))
+        return ", ".join(parts).strip() or self.offer_name or "-"
+
+
+class Message(NamedTuple):
+    id: str
+    author_id: str | None
+    text: str
+    image_url: str | None
+    is_auto: bool
+
+    @classmethod
+    def parse(cls, msg: dict) -> "Message":
+        author_id = msg.get("authorId")
+        if author_id is None:
+            author_id = (msg.get("author") or {}).get("id")
+        image_url = None
+        images = msg.get("images") or []
+        if isinstance(images, list):
+            for im in images:
+                if isinstance(im, dict):
+                    image_url = _image_preview_url(im)
+                    if image_url:
+                        break
+        return cls(
+            msg.get("id") or "",
+            normalize_id(author_id),
+            (msg.get("content") or "").strip(),
+            image_url,
+            bool((msg.get("metadata") or {}).get("isAuto")),
+        )
+
+
+class Chat(NamedTuple):
+    id: str
+    last_message: Message | None
+    participants: tuple[tuple[str | None, str], ...]
+
+    @classmethod
+    def parse(cls, chat: dict) -> "Chat":
+        last = chat.get("lastMessage")
+        return cls(
+            chat.get("id") or "",
+            Message.parse(last) if isinstance(last, dict) and last else None,
+            tuple(
+                (normalize_id(p.get("id")), p.get("username") or "")
+                for p in chat.get("participants") or []
+                if isinstance(p, dict)
+            ),
+        )
+
+    def peer_name(self, user_id: str | None) -> str:
+        name = ""
+        for pid, username in self.participants:
+            if user_id and pid == user_id:
+                continue
+            if username:
+                name = username
+        if not name and self.participants:
+            name = self.participants[0][1]
+        return name
+
+    def username_for(self, author_id: str | None) -> str | None:
+        if not author_id:
+            return None
+        for pid, username in self.participants:
+            if pid and pid == author_id:
+                return username or None
+        return None
+
+
+class Lot(NamedTuple):
+    id: int | None
+    title: str | None
+    availability: Any
+    price: Any
+    url: str | None
+    category_id: int | None
+    game_id: int | None
+    category_url: str | None
+
+    @classmethod
+    def from_offer(
+        cls,
+        offer: dict,
+        category_id: int | None = None,
+        game_id: int | None = None,
+        category_url: str | None = None,
+    ) -> "Lot":
+        offer_id = _maybe_int(offer.get("id"))
+        title = _rus_text(offer)
+        return cls(
+            offer_id,
+            title or None,
+            offer.get("availability"),
+            offer.get("price"),
+            f"https://starvell.com/offers/{offer_id}" if offer_id else None,
+            category_id,
+            game_id,
+            category_url,
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "availability": self.availability,
+            "price": self.price,
+            "url": self.url,
+            "category_id": self.category_id,
+            "game_id": self.game_id,
+            "category_url": self.category_url,
+        }
+
+
+def parse_orders(orders: list) -> list[Order]:
+    return [Order.parse(o) for o in orders or [] if isinstance(o, dict) and o.get("id")]
+
+
+def parse_messages(messages: list) -> list[Message]:
+    return [Message.parse(m) for m in messages or [] if isinstance(m, dict) and m.get("id")]
+
+
+def parse_chats(chats: list) -> list[Chat]:
+    return [Chat.parse(c) for c in chats or [] if isinstance(c, dict) and c.get("id")]
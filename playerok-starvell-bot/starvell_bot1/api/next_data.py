@@ -1,35 +1,99 @@
 import asyncio
-import json
-import re
+import logging
 import time
 from typing import Optional
 
 import aiohttp
 
-from api.rate_limiter import throttle
+from api.client import get_client
+from api.json_codec import loads
+from api.rate_limiter import PRIORITY_INTERACTIVE, throttle, use_priority
 
 
 _cached_build_id: Optional[str] = None
 _cached_at: float = 0.0
-_lock = asyncio.Lock()
+_retry_after: float = 0.0
+_refresh_task: Optional[asyncio.Task] = None
 _TTL_SECONDS = 1800
+_REFRESH_AHEAD_SECONDS = 300
+_RETRY_SECONDS = 30
 
+_NEXT_DATA_OPEN = b'<script id="__NEXT_DATA__" type="application/json">'
+_SCRIPT_CLOSE = b"</script>"
+_CHUNK_SIZE = 16384
 
-def reset_build_id() -> None:
+
+def reset_build_id(stale: Optional[str] = None) -> None:
     global _cached_build_id, _cached_at
+    if stale is not None and _cached_build_id != stale:
+        return
     _cached_build_id = None
     _cached_at = 0.0
 
 
-async def get_build_id(session_cookie: str) -> str:
-    global _cached_build_id, _cached_at
-    async with _lock:
-        if _cached_build_id and (time.time() - _cached_at) < _TTL_SECONDS:
-            return _cached_build_id
+def _ensure_refresh(session_cookie: str) -> asyncio.Task:
+    global _refresh_task
+    task = _refresh_task
+    if task is None or task.done():
+        with use_priority(PRIORITY_INTERACTIVE):
+            task = asyncio.get_running_loop().create_task(_refresh(session_cookie))
+        _refresh_task = task
+    return task
+
+
+async def _refresh(session_cookie: str) -> str:
+    global _cached_build_id, _cached_at, _retry_after
+    try:
         build_id = await _fetch_build_id(session_cookie)
-        _cached_build_id = build_id
-        _cached_at = time.time()
+    except Exception:
+        _retry_after = time.time() + _RETRY_SECONDS
+        raise
+    _cached_build_id = build_id
+    _cached_at = time.time()
+    _retry_after = 0.0
+    return build_id
+
+
+def _log_background_failure(task: asyncio.Task) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logging.getLogger("exfador.api").warning(f"build_id_refresh_failed error={exc}")
+
+
+async def get_build_id(session_cookie: str) -> str:
+    build_id = _cached_build_id
+    if build_id:
+        now = time.time()
+        if now - _cached_at >= _TTL_SECONDS - _REFRESH_AHEAD_SECONDS and now >= _retry_after:
+            task = _refresh_task
+            if task is None or task.done():
+                _ensure_refresh(session_cookie).add_done_callback(_log_background_failure)
         return build_id
+    return await asyncio.shield(_ensure_refresh(session_cookie))
+
+
+async def _scan_next_data(resp: aiohttp.ClientResponse) -> bytes:
+    tail = b""
+    payload: Optional[bytearray] = None
+    scanned = 0
+    async for chunk in resp.content.iter_chunked(_CHUNK_SIZE):
+        if payload is None:
+            buf = tail + chunk
+            idx = buf.find(_NEXT_DATA_OPEN)
+            if idx < 0:
+                tail = buf[-(len(_NEXT_DATA_OPEN) - 1):]
+                continue
+            payload = bytearray(buf[idx + len(_NEXT_DATA_OPEN):])
+            tail = b""
+        else:
+            payload += chunk
+        end = payload.find(_SCRIPT_CLOSE, scanned)
+        if end >= 0:
+            return bytes(payload[:end])
+        scanned = max(0, len(payload) - (len(_SCRIPT_CLOSE) - 1))
+    raise RuntimeError("Unable to locate __NEXT_DATA__ script")
 
 
 async def _fetch_build_id(session_cookie: str) -> str:
@@ -43,17 +107,13 @@ async def _fetch_build_id(session_cookie: str) -> str:
         "starvell.theme": "dark",
     }
     timeout = aiohttp.ClientTimeout(total=20)
-    async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-        await throttle()
-        async with session.get("https://starvell.com/") as resp:
-            resp.raise_for_status()
-            html = await resp.text()
-    match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html, re.DOTALL)
-    if not match:
-        raise RuntimeError("Unable to locate __NEXT_DATA__ script")
-    data = json.loads(match.group(1))
+    client = get_client()
+    await throttle()
+    async with client.get("/", headers=headers, cookies=cookies, timeout=timeout) as resp:
+        resp.raise_for_status()
+        raw = await _scan_next_data(resp)
+    data = loads(raw)
     build_id = data.get("buildId")
     if not build_id:
         raise RuntimeError("buildId not found in __NEXT_DATA__")
     return str(build_id)
-
@@ -1,6 +1,8 @@
 import aiohttp
 from aiohttp import ClientResponseError
 
+from api.client import get_client
+from api.json_codec import read_json
 from api.next_data import get_build_id, reset_build_id
 from api.rate_limiter import throttle
 
@@ -24,23 +26,23 @@ async def fetch_offer_detail(
     if sid_cookie:
         cookies["sid"] = sid_cookie
     timeout = aiohttp.ClientTimeout(total=20)
+    client = get_client()
     last_exc = None
     for attempt in range(2):
         build_id = await get_build_id(session_cookie)
-        url = f"https://starvell.com/_next/data/{build_id}/offers/{offer_id}.json?offer_id={offer_id}"
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-            try:
-                await throttle()
-                async with session.get(url) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    return data
-            except ClientResponseError as exc:
-                last_exc = exc
-                if exc.status == 404 and attempt == 0:
-                    reset_build_id()
-                    continue
-                raise
+        url = f"/_next/data/{build_id}/offers/{offer_id}.json?offer_id={offer_id}"
+        try:
+            await throttle(endpoint="offer_detail")
+            async with client.get(url, headers=headers, cookies=cookies, timeout=timeout) as resp:
+                resp.raise_for_status()
+                data = await read_json(resp, "offer_detail")
+                return data
+        except ClientResponseError as exc:
+            last_exc = exc
+            if exc.status == 404 and attempt == 0:
+                reset_build_id(build_id)
+                continue
+            raise
     if last_exc:
         raise last_exc
     raise RuntimeError("Unable to fetch offer detail")
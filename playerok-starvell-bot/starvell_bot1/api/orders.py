@@ -1,11 +1,24 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Container
+
 import aiohttp
 from aiohttp import ClientResponseError, ContentTypeError
 
+from api.client import get_client
+from api.conditional import PollValidator
+from api.json_codec import decode, read_json
+from api.models import parse_created_at
 from api.next_data import get_build_id, reset_build_id
 from api.rate_limiter import throttle
 
 
-async def fetch_sells(session_cookie: str, page: int | None = None, my_games_cookie: str | None = None) -> dict:
+async def fetch_sells(
+    session_cookie: str,
+    page: int | None = None,
+    my_games_cookie: str | None = None,
+    validator: PollValidator | None = None,
+) -> dict | None:
     headers = {
         "accept": "*/*",
         "accept-language": "ru,en;q=0.9",
@@ -17,54 +30,124 @@ async def fetch_sells(session_cookie: str, page: int | None = None, my_games_coo
     if my_games_cookie:
         cookies["starvell.my_games"] = my_games_cookie
     timeout = aiohttp.ClientTimeout(total=20)
+    client = get_client()
     last_exc = None
     for attempt in range(2):
         build_id = await get_build_id(session_cookie)
-        url = f"https://starvell.com/_next/data/{build_id}/account/sells.json"
+        url = f"/_next/data/{build_id}/account/sells.json"
         if isinstance(page, int) and page > 1:
             url += f"?page={page}"
-        async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-            try:
-                await throttle()
-                async with session.get(url) as resp:
-                    resp.raise_for_status()
-                    return await resp.json()
-            except ClientResponseError as exc:
-                last_exc = exc
-                if exc.status == 404 and attempt == 0:
-                    reset_build_id()
-                    continue
-                raise
+        try:
+            await throttle()
+            request_headers = {**headers, **validator.headers()} if validator is not None else headers
+            async with client.get(url, headers=request_headers, cookies=cookies, timeout=timeout) as resp:
+                resp.raise_for_status()
+                if validator is None:
+                    return await read_json(resp, "sells", select=("orders",))
+                raw = b"" if resp.status == 304 else await resp.read()
+                if validator.observe(resp.status, resp.headers, raw):
+                    return None
+                return await decode(raw, "sells", select=("orders",))
+        except ClientResponseError as exc:
+            last_exc = exc
+            if exc.status == 404 and attempt == 0:
+                reset_build_id(build_id)
+                continue
+            raise
     if last_exc:
         raise last_exc
     raise RuntimeError("Unable to fetch sells list")
 
 
-async def fetch_sells_all(session_cookie: str, max_pages: int = 200) -> list[dict]:
-    items: list[dict] = []
-    page = 1
-    seen_ids: set[str] = set()
-    while page <= max_pages:
+def _consume_result(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+async def _fetch_sells_page(
+    session_cookie: str,
+    page: int,
+    my_games_cookie: str | None = None,
+    retries: int = 2,
+    backoff: float = 1.0,
+) -> list[dict]:
+    attempt = 0
+    while True:
         try:
-            data = await fetch_sells(session_cookie, page=page if page > 1 else None)
+            data = await fetch_sells(session_cookie, page=page if page > 1 else None, my_games_cookie=my_games_cookie)
+            return ((data or {}).get("pageProps") or {}).get("orders") or []
+        except ClientResponseError as exc:
+            if exc.status in (401, 403) or attempt >= retries:
+                raise
         except Exception:
-            break
-        page_props = (data or {}).get("pageProps", {})
-        orders = page_props.get("orders") or []
-        if not orders:
-            break
-        for o in orders:
-            try:
+            if attempt >= retries:
+                raise
+        await asyncio.sleep(backoff * (2 ** attempt))
+        attempt += 1
+
+
+async def iter_sells_pages(
+    session_cookie: str,
+    start_page: int = 1,
+    max_pages: int = 200,
+    prefetch: int = 3,
+    my_games_cookie: str | None = None,
+    retries: int = 2,
+    backoff: float = 1.0,
+) -> AsyncIterator[tuple[int, list[dict]]]:
+    loop = asyncio.get_running_loop()
+    pending: deque[tuple[int, asyncio.Task]] = deque()
+    next_page = max(1, int(start_page))
+
+    def _schedule() -> None:
+        nonlocal next_page
+        while len(pending) < max(1, int(prefetch)) and next_page <= max_pages:
+            task = loop.create_task(_fetch_sells_page(session_cookie, next_page, my_games_cookie, retries, backoff))
+            pending.append((next_page, task))
+            next_page += 1
+
+    try:
+        _schedule()
+        while pending:
+            page, task = pending.popleft()
+            orders = await task
+            if not orders:
+                return
+            _schedule()
+            yield page, orders
+    finally:
+        for _page, task in pending:
+            task.cancel()
+            task.add_done_callback(_consume_result)
+
+
+async def iter_sells(
+    session_cookie: str,
+    known_ids: Container[str] | None = None,
+    created_after: float | None = None,
+    max_pages: int = 200,
+    prefetch: int = 3,
+    my_games_cookie: str | None = None,
+) -> AsyncIterator[dict]:
+    seen_ids: set[str] = set()
+    pages = iter_sells_pages(session_cookie, max_pages=max_pages, prefetch=prefetch, my_games_cookie=my_games_cookie)
+    try:
+        async for _page, orders in pages:
+            for o in orders:
                 oid = str((o or {}).get("id") or "")
-                if oid and oid in seen_ids:
-                    continue
+                if oid and known_ids is not None and oid in known_ids:
+                    return
+                if created_after is not None:
+                    ts = parse_created_at(o.get("createdAt"))
+                    if ts is not None and ts < created_after:
+                        return
                 if oid:
+                    if oid in seen_ids:
+                        continue
                     seen_ids.add(oid)
-                items.append(o)
-            except Exception:
-                items.append(o)
-        page += 1
-    return items
+                yield o
+    finally:
+        await pages.aclose()
 
 
 async def refund_order(
@@ -87,23 +170,22 @@ async def refund_order(
     if sid_cookie:
         cookies["sid"] = sid_cookie
     timeout = aiohttp.ClientTimeout(total=20)
-    url = "https://starvell.com/api/orders/refund"
     payload = {"orderId": order_id}
-    async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-        await throttle()
-        async with session.post(url, json=payload) as resp:
-            resp.raise_for_status()
+    client = get_client()
+    await throttle()
+    async with client.post("/api/orders/refund", json=payload, headers=headers, cookies=cookies, timeout=timeout) as resp:
+        resp.raise_for_status()
+        try:
+            ct = resp.headers.get("Content-Type", "")
+            if "application/json" in ct.lower():
+                return await resp.json()
+            text = await resp.text()
+            return {"status": resp.status, "text": text}
+        except ContentTypeError:
             try:
-                ct = resp.headers.get("Content-Type", "")
-                if "application/json" in ct.lower():
-                    return await resp.json()
                 text = await resp.text()
-                return {"status": resp.status, "text": text}
-            except ContentTypeError:
-                try:
-                    text = await resp.text()
-                except Exception:
-                    text = ""
-                return {"status": resp.status, "text": text}
+            except Exception:
+                text = ""
+            return {"status": resp.status, "text": text}
 
 
@@ -1,7 +1,10 @@
 import asyncio
+import contextvars
+import heapq
+import itertools
 import os
-import threading
 import time
+from contextlib import contextmanager
 
 
 def _effective_rpm(default: int = 40) -> int:
@@ -18,58 +21,188 @@ def _effective_rpm(default: int = 40) -> int:
     return min(v, 40)
 
 
+def _effective_burst(rpm: int, default: int = 5) -> int:
+    raw = os.getenv("STARVELL_BURST", "").strip()
+    try:
+        v = int(raw) if raw else default
+    except Exception:
+        v = default
+    return max(1, min(v, rpm - 1)) if rpm > 1 else 1
+
+
 STARVELL_MAX_PER_MINUTE: int = _effective_rpm(40)
+STARVELL_BURST: int = _effective_burst(STARVELL_MAX_PER_MINUTE)
 MIN_INTERVAL_SECONDS: float = 60.0 / float(STARVELL_MAX_PER_MINUTE)
 
+PRIORITY_INTERACTIVE = 0
+PRIORITY_ORDERS = 1
+PRIORITY_CHATS = 2
+PRIORITY_BUMP = 3
 
-class _AsyncMinIntervalLimiter:
-    def __init__(self, min_interval_seconds: float) -> None:
-        self._min_interval = float(min_interval_seconds)
-        self._lock = asyncio.Lock()
-        self._next_allowed: float = 0.0
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_ORDERS: "orders",
+    PRIORITY_CHATS: "chats",
+    PRIORITY_BUMP: "bump",
+}
 
-    async def wait(self) -> None:
+ENDPOINT_BUDGETS_PER_MINUTE: dict[str, int] = {
+    "offer_detail": 12,
+    "bump": 6,
+}
 
-        loop = asyncio.get_running_loop()
-        async with self._lock:
-            now = loop.time()
-            if self._next_allowed <= 0.0:
-                self._next_allowed = now
-            delay = self._next_allowed - now
-            if delay > 0:
-                await asyncio.sleep(delay)
-                now = loop.time()
-            self._next_allowed = now + self._min_interval
+_priority_var: contextvars.ContextVar[int] = contextvars.ContextVar("starvell_priority", default=PRIORITY_INTERACTIVE)
 
 
-class _SyncMinIntervalLimiter:
-    def __init__(self, min_interval_seconds: float) -> None:
-        self._min_interval = float(min_interval_seconds)
-        self._lock = threading.Lock()
-        self._next_allowed: float = 0.0
+def set_priority(level: int) -> None:
+    _priority_var.set(int(level))
+
+
+@contextmanager
+def use_priority(level: int):
+    token = _priority_var.set(int(level))
+    try:
+        yield
+    finally:
+        _priority_var.reset(token)
 
-    def wait(self) -> None:
-        now = time.monotonic()
-        with self._lock:
-            if self._next_allowed <= 0.0:
-                self._next_allowed = now
-            delay = self._next_allowed - now
-            if delay > 0:
-                time.sleep(delay)
-                now = time.monotonic()
-            self._next_allowed = now + self._min_interval
 
+class _TokenBucket:
+    def __init__(self, per_minute: float, burst: int) -> None:
+        self.capacity = float(max(1, burst))
+        self.rate = max(1.0, float(per_minute) - self.capacity) / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
 
-_async_limiter = _AsyncMinIntervalLimiter(MIN_INTERVAL_SECONDS)
-_sync_limiter = _SyncMinIntervalLimiter(MIN_INTERVAL_SECONDS)
+    def refill(self) -> float:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated = now
+        return self.tokens
+
+    def delay(self) -> float:
+        return max(0.0, (1.0 - self.refill()) / self.rate)
+
+
+class _LaneStats:
+    __slots__ = ("depth", "requests", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "queue_depth": self.depth,
+            "requests": self.requests,
+            "wait_avg": (self.wait_total / self.requests) if self.requests else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+
+class _AsyncPriorityLimiter:
+    def __init__(self, per_minute: int, burst: int, endpoint_budgets: dict[str, int] | None = None) -> None:
+        self._bucket = _TokenBucket(per_minute, burst)
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._pump_task: asyncio.Task | None = None
+        self._endpoint_budgets = dict(endpoint_budgets or {})
+        self._endpoints: dict[str, _TokenBucket] = {}
+        self._endpoint_locks: dict[str, asyncio.Lock] = {}
+        self._lanes: dict[int, _LaneStats] = {}
+        self._endpoint_stats: dict[str, _LaneStats] = {}
+
+    def _lane(self, level: int) -> _LaneStats:
+        lane = self._lanes.get(level)
+        if lane is None:
+            lane = _LaneStats()
+            self._lanes[level] = lane
+        return lane
+
+    async def _wait_endpoint(self, endpoint: str) -> None:
+        budget = self._endpoint_budgets.get(endpoint)
+        if not budget:
+            return
+        bucket = self._endpoints.get(endpoint)
+        if bucket is None:
+            bucket = _TokenBucket(budget, max(1, budget // 6))
+            self._endpoints[endpoint] = bucket
+            self._endpoint_locks[endpoint] = asyncio.Lock()
+        stats = self._endpoint_stats.setdefault(endpoint, _LaneStats())
+        stats.depth += 1
+        try:
+            async with self._endpoint_locks[endpoint]:
+                while True:
+                    delay = bucket.delay()
+                    if delay <= 0:
+                        bucket.tokens -= 1.0
+                        return
+                    await asyncio.sleep(delay)
+        finally:
+            stats.depth -= 1
+
+    async def wait(self, level: int, endpoint: str | None = None) -> float:
+        started = time.monotonic()
+        if endpoint:
+            await self._wait_endpoint(endpoint)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        lane = self._lane(level)
+        lane.depth += 1
+        heapq.heappush(self._waiters, (level, next(self._seq), fut))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = loop.create_task(self._pump())
+        try:
+            await fut
+        finally:
+            lane.depth -= 1
+        waited = time.monotonic() - started
+        lane.requests += 1
+        lane.wait_total += waited
+        lane.wait_max = max(lane.wait_max, waited)
+        if endpoint and endpoint in self._endpoint_stats:
+            es = self._endpoint_stats[endpoint]
+            es.requests += 1
+            es.wait_total += waited
+            es.wait_max = max(es.wait_max, waited)
+        return waited
+
+    async def _pump(self) -> None:
+        while self._waiters:
+            delay = self._bucket.delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            while self._waiters:
+                _level, _seq, fut = heapq.heappop(self._waiters)
+                if fut.done():
+                    continue
+                self._bucket.tokens -= 1.0
+                fut.set_result(None)
+                break
 
+    def metrics(self) -> dict:
+        return {
+            "per_minute": STARVELL_MAX_PER_MINUTE,
+            "burst": int(self._bucket.capacity),
+            "tokens": round(self._bucket.refill(), 3),
+            "queue_depth": sum(1 for _l, _s, f in self._waiters if not f.done()),
+            "lanes": {PRIORITY_NAMES.get(k, str(k)): v.as_dict() for k, v in sorted(self._lanes.items())},
+            "endpoints": {k: v.as_dict() for k, v in sorted(self._endpoint_stats.items())},
+        }
 
-async def throttle() -> None:
-    await _async_limiter.wait()
 
+_async_limiter = _AsyncPriorityLimiter(STARVELL_MAX_PER_MINUTE, STARVELL_BURST, ENDPOINT_BUDGETS_PER_MINUTE)
 
-def throttle_sync() -> None:
-    _sync_limiter.wait()
 
+async def throttle(priority: int | None = None, endpoint: str | None = None) -> None:
+    level = _priority_var.get() if priority is None else int(priority)
+    await _async_limiter.wait(level, endpoint)
 
 
+def limiter_metrics() -> dict:
+    return _async_limiter.metrics()
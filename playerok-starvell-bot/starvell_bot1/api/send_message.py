@@ -1,6 +1,7 @@
 import json
 import aiohttp
 
+from api.client import StarvellHTTPError, get_client
 from api.rate_limiter import throttle
 
 
@@ -17,18 +18,17 @@ async def send_chat_message(session_cookie: str, chat_id: str, content: str, my_
     if my_games_cookie:
         cookies["starvell.my_games"] = my_games_cookie
     payload = {"chatId": chat_id, "content": content}
-    url = "https://starvell.com/api/messages/send"
     timeout = aiohttp.ClientTimeout(total=20)
-    async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-        await throttle()
-        async with session.post(url, json=payload) as resp:
-            response_text = await resp.text()
-            if resp.status >= 400:
-                raise RuntimeError(f"HTTP {resp.status}: {response_text}")
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError as exc:
-                raise RuntimeError("Invalid response from server") from exc
+    client = get_client()
+    await throttle()
+    async with client.post("/api/messages/send", json=payload, headers=headers, cookies=cookies, timeout=timeout) as resp:
+        response_text = await resp.text()
+        if resp.status >= 400:
+            raise StarvellHTTPError(resp.status, response_text)
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError as exc:
+            raise RuntimeError("Invalid response from server") from exc
 
 
 async def send_chat_image(
@@ -60,15 +60,15 @@ async def send_chat_image(
     if isinstance(content, str) and content.strip():
         form.add_field("content", content.strip())
 
-    url = f"https://starvell.com/api/messages/send-with-image?chatId={chat_id}"
+    url = f"/api/messages/send-with-image?chatId={chat_id}"
     timeout = aiohttp.ClientTimeout(total=60)
-    async with aiohttp.ClientSession(headers=headers, cookies=cookies, timeout=timeout) as session:
-        await throttle()
-        async with session.post(url, data=form) as resp:
-            response_text = await resp.text()
-            if resp.status >= 400:
-                raise RuntimeError(f"HTTP {resp.status}: {response_text}")
-            try:
-                return json.loads(response_text)
-            except json.JSONDecodeError as exc:
-                raise RuntimeError("Invalid response from server") from exc
+    client = get_client()
+    await throttle()
+    async with client.post(url, data=form, headers=headers, cookies=cookies, timeout=timeout) as resp:
+        response_text = await resp.text()
+        if resp.status >= 400:
+            raise StarvellHTTPError(resp.status, response_text)
+        try:
+            return json.loads(response_text)
+        except json.JSONDecodeError as exc:
+            raise RuntimeError("Invalid response from server") from exc
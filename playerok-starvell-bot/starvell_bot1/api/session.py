@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+from api.auth import fetch_homepage_data
+from api.client import _env_int
+from api.find_lots_user import find_user_lots
+from api.rate_limiter import PRIORITY_INTERACTIVE, use_priority
+
+
+AUTH_ERROR_STATUSES = (401, 403)
+
+
+def is_auth_error(exc: BaseException) -> bool:
+    return getattr(exc, "status", None) in AUTH_ERROR_STATUSES
+
+
+class StarvellSession:
+    def __init__(self, ttl: float | None = None) -> None:
+        self.ttl = float(ttl if ttl is not None else _env_int("STARVELL_SESSION_TTL", 600))
+        self._cookie: str | None = None
+        self._auth: dict | None = None
+        self._fetched_at = 0.0
+        self._my_games_checked = False
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    def _fresh(self, session_cookie: str, need_my_games: bool) -> bool:
+        if self._auth is None or self._cookie != session_cookie:
+            return False
+        if time.monotonic() - self._fetched_at >= self.ttl:
+            return False
+        return not need_my_games or bool(self._auth.get("my_games")) or self._my_games_checked
+
+    def invalidate(self) -> None:
+        self._auth = None
+        self._fetched_at = 0.0
+        self._my_games_checked = False
+
+    def remember(self, session_cookie: str, sid: str | None = None, my_games: str | None = None) -> None:
+        if self._auth is None or self._cookie != session_cookie:
+            return
+        if sid:
+            self._auth["sid"] = sid
+        if my_games:
+            self._auth["my_games"] = my_games
+
+    async def get(self, session_cookie: str, need_my_games: bool = False, force: bool = False) -> dict:
+        if not force and self._fresh(session_cookie, need_my_games):
+            return self._auth
+        async with self._lock:
+            with use_priority(PRIORITY_INTERACTIVE):
+                if not force and self._fresh(session_cookie, need_my_games):
+                    return self._auth
+                same = self._auth is not None and self._cookie == session_cookie
+                if force or not same or time.monotonic() - self._fetched_at >= self.ttl:
+                    prev_my_games = self._auth.get("my_games") if same else None
+                    auth = await fetch_homepage_data(session_cookie, my_games_cookie=prev_my_games)
+                    self.refreshes += 1
+                    if not (auth.get("authorized") and auth.get("user")):
+                        self.invalidate()
+                        return auth
+                    self._cookie = session_cookie
+                    self._auth = auth
+                    self._fetched_at = time.monotonic()
+                    self._my_games_checked = False
+                auth = self._auth
+                if need_my_games and not auth.get("my_games") and not self._my_games_checked:
+                    self._my_games_checked = True
+                    try:
+                        uid = int((auth.get("user") or {}).get("id"))
+                    except Exception:
+                        uid = None
+                    if uid:
+                        lots_data = await find_user_lots(session_cookie, auth.get("sid") or "", uid)
+                        auth["my_games"] = (lots_data or {}).get("my_games") or auth.get("my_games")
+                return auth
+
+
+_session: StarvellSession | None = None
+
+
+def get_session() -> StarvellSession:
+    global _session
+    if _session is None:
+        _session = StarvellSession()
+    return _session
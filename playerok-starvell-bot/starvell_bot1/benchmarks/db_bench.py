@@ -0,0 +1,65 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tg_bot_exfa.storage.db import Database
+
+
+async def _seed(db: Database, users: int, chats: int) -> None:
+    for uid in range(users):
+        await db.get_user(uid)
+        await db.set_authorized(uid, True)
+    for cid in range(chats):
+        await db.set_last_notified_message(f"chat-{cid}", f"msg-{cid}")
+        await db.mark_order_notified(f"order-{cid}")
+
+
+async def _mixed_ops(db: Database, ops: int, users: int, chats: int, worker: int) -> None:
+    for i in range(ops):
+        k = (i + worker) % 10
+        if k < 4:
+            await db.get_user(i % users)
+        elif k < 7:
+            await db.is_order_notified(f"order-{i % chats}")
+        elif k < 9:
+            await db.get_last_notified_message(f"chat-{i % chats}")
+        else:
+            await db.set_last_notified_message(f"chat-{i % chats}", f"msg-{i}")
+
+
+async def _run(persistent: bool, path: str, ops: int, concurrency: int, users: int, chats: int) -> float:
+    db = Database(path, persistent=persistent)
+    await db.init()
+    await _seed(db, users, chats)
+    per_worker = max(1, ops // concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*[_mixed_ops(db, per_worker, users, chats, w) for w in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    await db.close()
+    return (per_worker * concurrency) / elapsed if elapsed > 0 else 0.0
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Database ops/sec: per-call connections vs persistent connections")
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        results: dict[str, float] = {}
+        for label, persistent in (("per-call", False), ("persistent", True)):
+            path = os.path.join(tmp, f"{label}.sqlite3")
+            results[label] = await _run(persistent, path, args.ops, args.concurrency, args.users, args.chats)
+            print(f"{label:>10}: {results[label]:10.1f} ops/sec")
+        if results["per-call"] > 0:
+            print(f"{'speedup':>10}: {results['persistent'] / results['per-call']:10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.models import Order
+
+
+RECIPIENTS = ((1, "ru"), (2, "en"), (3, "ru"))
+
+
+def _order(i: int) -> dict:
+    return {
+        "id": f"order-{i}",
+        "status": "COMPLETED" if i % 2 else "CREATED",
+        "quantity": 1 + i % 3,
+        "basePrice": 12345 + i,
+        "createdAt": "2025-01-01T12:00:00.000Z",
+        "user": {"id": 1000 + i, "username": f"buyer{i}"},
+        "offerDetails": {
+            "game": {"name": "Roblox"},
+            "category": {"name": "Robux"},
+            "subCategory": {"name": "Gift card" if i % 4 == 1 else ""},
+            "attributes": [{"value": {"nameRu": "EU"}}, {"value": {"name": "Instant"}}] if i % 4 == 0 else [],
+            "descriptions": {"rus": {"briefDescription": f"Robux pack {i % 10}", "description": "long text " * 20}},
+            "offer": {"name": "offer name"},
+        },
+    }
+
+
+def _fmt_minor_rub(v) -> str:
+    try:
+        iv = int(v)
+        return f"{iv/100:.2f}"
+    except Exception:
+        try:
+            fv = float(v)
+            return f"{fv/100:.2f}"
+        except Exception:
+            return "0.00"
+
+
+def _legacy_new(order: dict) -> int:
+    out = 0
+    offer = order.get("offerDetails") or {}
+    offer_obj = offer.get("offer") or {}
+    desc_rus = ((offer.get("descriptions") or {}).get("rus") or {})
+    name = (
+        str(desc_rus.get("briefDescription") or "").strip()
+        or str(desc_rus.get("description") or "").strip()
+        or str(offer_obj.get("name") or "").strip()
+        or str(offer.get("name") or "").strip()
+        or str(offer.get("title") or "").strip()
+    )
+    out += len(name)
+    order_id = order.get("id")
+    qty = order.get("quantity") or 1
+    total_price = order.get("basePrice") or order.get("totalPrice") or 0
+    user = order.get("user") or {}
+    buyer = user.get("username") or str(user.get("id") or "-")
+    offer = order.get("offerDetails") or {}
+    game = (offer.get("game") or {}).get("name") or "-"
+    category = (offer.get("category") or {}).get("name") or "-"
+    sub_category_name = ((offer.get("subCategory") or {}).get("name") or "").strip()
+    attr_values: list[str] = []
+    for attr in offer.get("attributes") or []:
+        try:
+            value = (attr or {}).get("value") or {}
+            name_ru = str(value.get("nameRu") or value.get("name") or "").strip()
+            if name_ru:
+                attr_values.append(name_ru)
+        except Exception:
+            continue
+    product_parts: list[str] = []
+    if sub_category_name:
+        product_parts.append(sub_category_name)
+    if attr_values:
+        product_parts.append(", ".join(attr_values))
+    product = ", ".join(product_parts).strip()
+    if not product:
+        offer_obj = (offer.get("offer") or {})
+        des_rus = ((offer.get("descriptions") or {}).get("rus") or {})
+        product = (
+            str(des_rus.get("briefDescription") or "").strip()
+            or str(des_rus.get("description") or "").strip()
+            or str(offer_obj.get("name") or "").strip()
+            or str(offer.get("name") or "").strip()
+            or str(offer.get("title") or "").strip()
+            or "-"
+        )
+    text_by_lang: dict[str, str] = {}
+    for _chat_id, lang in RECIPIENTS:
+        if lang not in text_by_lang:
+            text_by_lang[lang] = f"{lang} {order_id} {buyer} {game} {category} {product} {qty} {_fmt_minor_rub(total_price)}"
+        out += len(text_by_lang[lang])
+    user = order.get("user") or {}
+    buyer = user.get("username") or str(user.get("id") or "-")
+    total_price = order.get("basePrice") or order.get("totalPrice") or 0
+    offer = order.get("offerDetails") or {}
+    game = (offer.get("game") or {}).get("name") or "-"
+    category = (offer.get("category") or {}).get("name") or "-"
+    out += len(f"{order_id} | {buyer} | {game} / {category} | {total_price}")
+    return out
+
+
+def _legacy_completed(order: dict) -> int:
+    out = 0
+    order_id = order.get("id")
+    qty = order.get("quantity") or 1
+    total_price = order.get("basePrice") or order.get("totalPrice") or 0
+    user = order.get("user") or {}
+    buyer = user.get("username") or str(user.get("id") or "-")
+    offer = order.get("offerDetails") or {}
+    game = (offer.get("game") or {}).get("name") or "-"
+    category = (offer.get("category") or {}).get("name") or "-"
+    for _chat_id, lang in RECIPIENTS:
+        out += len(f"{lang} {order_id} {buyer} {game} {category} {qty} {_fmt_minor_rub(total_price)}")
+    user = order.get("user") or {}
+    buyer = user.get("username") or str(user.get("id") or "-")
+    offer = order.get("offerDetails") or {}
+    game = (offer.get("game") or {}).get("name") or "-"
+    category = (offer.get("category") or {}).get("name") or "-"
+    out += len(f"{order_id} | {buyer} | {game} / {category}")
+    return out
+
+
+def _legacy(orders: list[dict]) -> int:
+    out = 0
+    for order in orders:
+        if order.get("status") == "CREATED":
+            out += _legacy_new(order)
+        else:
+            out += _legacy_completed(order)
+    return out
+
+
+def _models(orders: list[dict]) -> int:
+    out = 0
+    for raw in orders:
+        order = Order.parse(raw)
+        if order.status == "CREATED":
+            out += len(order.offer_name)
+            product = order.product
+            text_by_lang: dict[str, str] = {}
+            for _chat_id, lang in RECIPIENTS:
+                if lang not in text_by_lang:
+                    text_by_lang[lang] = (
+                        f"{lang} {order.id} {order.buyer} {order.game} {order.category} {product} {order.quantity} {order.price_rub}"
+                    )
+                out += len(text_by_lang[lang])
+            out += len(f"{order.id} | {order.buyer} | {order.game} / {order.category} | {order.price_rub}")
+        else:
+            text_by_lang = {}
+            for _chat_id, lang in RECIPIENTS:
+                text = text_by_lang.get(lang)
+                if text is None:
+                    text = f"{lang} {order.id} {order.buyer} {order.game} {order.category} {order.quantity} {order.price_rub}"
+                    text_by_lang[lang] = text
+                out += len(text)
+            out += len(f"{order.id} | {order.buyer} | {order.game} / {order.category}")
+    return out
+
+
+def _time(fns: dict, orders: list[dict], rounds: int) -> dict[str, float]:
+    best = {label: float("inf") for label in fns}
+    for fn in fns.values():
+        fn(orders)
+    for _ in range(rounds):
+        for label, fn in fns.items():
+            started = time.perf_counter()
+            fn(orders)
+            best[label] = min(best[label], time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="New/completed order notification formatting: dict walking vs models")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--recipients", type=int, default=3)
+    args = parser.parse_args()
+    global RECIPIENTS
+    RECIPIENTS = tuple((i, ("ru", "en")[i % 2]) for i in range(max(1, args.recipients)))
+    orders = [_order(i) for i in range(args.orders)]
+    results = _time({"dicts": _legacy, "models": _models}, orders, args.rounds)
+    for label, elapsed in results.items():
+        rate = args.orders / elapsed if elapsed > 0 else 0.0
+        print(f"{label:>10}: {elapsed * 1000:10.3f} ms/page {rate:12.0f} orders/s")
+    if results["models"] > 0:
+        print(f"{'speedup':>10}: {results['dicts'] / results['models']:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tg_bot_exfa.orders_pipeline import load_order_plan
+from tg_bot_exfa.storage.db import Database
+
+
+STATUSES = ("CREATED", "COMPLETED", "REFUND")
+
+
+def _page(size: int, round_no: int) -> list[dict]:
+    orders = []
+    for i in range(size):
+        status = STATUSES[(i + round_no) % len(STATUSES)] if i % 10 == 0 else STATUSES[i % 2]
+        orders.append({"id": f"order-{i}", "status": status, "quantity": 1})
+    return orders
+
+
+async def _serial(db: Database, orders: list[dict]) -> None:
+    for order in orders:
+        order_id = order["id"]
+        status = order["status"]
+        if status == "CREATED" and not await db.is_order_notified(order_id):
+            await db.mark_order_notified(order_id)
+    for order in orders:
+        order_id = order["id"]
+        status = order["status"]
+        prev = await db.get_order_status(order_id)
+        if prev != status:
+            await db.set_order_status(order_id, status)
+
+
+async def _batched(db: Database, orders: list[dict]) -> None:
+    plan = await load_order_plan(db, orders)
+    for order in plan.new_orders:
+        await db.mark_order_notified(str(order["id"]))
+    await db.apply_order_updates(plan.status_writes)
+
+
+async def _run(label: str, path: str, size: int, rounds: int) -> float:
+    db = Database(path)
+    await db.init()
+    step = _serial if label == "serial" else _batched
+    await step(db, _page(size, 0))
+    started = time.perf_counter()
+    for r in range(1, rounds + 1):
+        await step(db, _page(size, r))
+    elapsed = time.perf_counter() - started
+    await db.close()
+    return elapsed / rounds
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Order page processing: per-order queries vs batched pipeline")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        results: dict[str, float] = {}
+        for label in ("serial", "batched"):
+            path = os.path.join(tmp, f"{label}.sqlite3")
+            results[label] = await _run(label, path, args.orders, args.rounds)
+            print(f"{label:>10}: {results[label] * 1000:10.2f} ms/page")
+        if results["batched"] > 0:
+            print(f"{'speedup':>10}: {results['serial'] / results['batched']:10.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,14 +8,19 @@ from aiogram.client.default import DefaultBotProperties
 
 import tg_bot_exfa.app as app
 from tg_bot_exfa.config import load_config, save_config, md5_hex
+from tg_bot_exfa.config_store import get_store as get_config_store
 from tg_bot_exfa.storage.db import Database
 from tg_bot_exfa.handlers.start import router as start_router
 from tg_bot_exfa.handlers.callbacks import router as callbacks_router
 from tg_bot_exfa.handlers.plugins import router as plugins_router
 from tg_bot_exfa.handlers.plugin_cmds import router as plugin_cmds_router
 from tg_bot_exfa.monitor import start_monitor, load_config as load_osnova_config
-from api.auth import fetch_homepage_data
+from api.session import get_session
+from api.client import close_client
 from tg_bot_exfa.logger import setup_logging
+from tg_bot_exfa.notifier import close_dispatcher, get_dispatcher
+from tg_bot_exfa.utils.http import close_session as close_http_session
+from tg_bot_exfa.utils.loop_watchdog import start_loop_watchdog
 from tg_bot_exfa.handlers.logs import router as logs_router
 from tg_bot_exfa.plugins import PluginManager, PluginContext
 from pathlib import Path
@@ -52,13 +57,23 @@ async def run_bot() -> None:
                         obj = {}
                 obj["SESSION_COOKIE"] = session_cookie
                 cfg_path.write_text(json.dumps(obj, ensure_ascii=False, indent=4), encoding="utf-8")
+                get_config_store().reload()
         except Exception:
             pass
     db_path = os.path.join(os.path.dirname(__file__), "bot.sqlite3")
     db = Database(db_path)
     await db.init()
     app.app_context = app.AppContext(cfg, db)
+
+    def _on_config_change(_old, _new) -> None:
+        if app.app_context is not None:
+            app.app_context.config = load_config()
+
+    config_store = get_config_store()
+    config_store.subscribe(_on_config_change)
+    config_store.start_watch()
     bot = Bot(token=cfg.token, default=DefaultBotProperties(parse_mode="HTML"))
+    get_dispatcher().attach(bot)
     dp = Dispatcher(storage=MemoryStorage())
     try:
         Path("plugins").mkdir(parents=True, exist_ok=True)
@@ -124,7 +139,7 @@ async def run_bot() -> None:
         session_cookie = (osnova_cfg or {}).get("SESSION_COOKIE", "")
         profile_name = "NULL"
         try:
-            auth = await fetch_homepage_data(session_cookie)
+            auth = await get_session().get(session_cookie)
             if auth.get("authorized") and auth.get("user"):
                 user = auth.get("user") or {}
                 profile_name = str(user.get("username") or user.get("login") or user.get("id") or "NULL")
@@ -176,10 +191,24 @@ async def run_bot() -> None:
             pass
     except Exception:
         pass
+    try:
+        start_loop_watchdog(
+            float((osnova_cfg or {}).get("LOOP_LAG_WARN_MS", 100)),
+            debug=bool((osnova_cfg or {}).get("LOOP_DEBUG", False)),
+        )
+    except Exception:
+        log.warning("Loop watchdog failed to start")
     mt = asyncio.create_task(start_monitor())
     app.app_context.monitor_task = mt
     log.info("Polling started")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await close_client()
+        await close_dispatcher()
+        await close_http_session()
+        config_store.stop_watch()
+        await db.close()
 
 
 def main() -> None:
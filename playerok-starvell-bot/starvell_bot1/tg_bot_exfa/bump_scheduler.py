@@ -0,0 +1,197 @@
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Mapping
+
+
+BUMP_SCHEDULE_KEY = "bump_schedule"
+
+_COOLDOWN_KEYS = ("retryAfter", "retry_after", "cooldown", "secondsLeft", "timeLeft", "remaining")
+_AVAILABLE_AT_KEYS = ("nextBumpAt", "availableAt", "canBumpAt", "bumpAvailableAt", "nextBumpDate")
+_UNIT_PATTERNS = (
+    (re.compile(r"(\d+)\s*(?:д|дн|день|дня|дней|d|day|days)\b", re.IGNORECASE), 86400),
+    (re.compile(r"(\d+)\s*(?:ч|час|часа|часов|h|hr|hour|hours)\b", re.IGNORECASE), 3600),
+    (re.compile(r"(\d+)\s*(?:м|мин|минут|минуты|минуту|m|min|minute|minutes)\b", re.IGNORECASE), 60),
+    (re.compile(r"(\d+)\s*(?:с|сек|секунд|секунды|s|sec|second|seconds)\b", re.IGNORECASE), 1),
+)
+
+
+def _epoch(value) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) / 1000.0 if value > 1e12 else float(value)
+    if isinstance(value, str) and value.strip():
+        ts = value.strip()
+        try:
+            return datetime.fromisoformat(ts[:-1] + "+00:00" if ts.endswith("Z") else ts).timestamp()
+        except Exception:
+            return None
+    return None
+
+
+def _text_seconds(text: str) -> float | None:
+    total = 0
+    for pattern, unit in _UNIT_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            total += int(m.group(1)) * unit
+    return float(total) if total > 0 else None
+
+
+def cooldown_from_response(response: dict, now: float | None = None) -> float | None:
+    now = time.time() if now is None else now
+    resp = response or {}
+    retry_after = resp.get("retry_after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except Exception:
+            pass
+    body = resp.get("json")
+    candidates = [body] if isinstance(body, dict) else []
+    if isinstance(body, dict):
+        for nested in ("data", "error", "meta"):
+            if isinstance(body.get(nested), dict):
+                candidates.append(body[nested])
+    for obj in candidates:
+        for key in _AVAILABLE_AT_KEYS:
+            at = _epoch(obj.get(key))
+            if at is not None and at > 1e9:
+                return max(0.0, at - now)
+        for key in _COOLDOWN_KEYS:
+            value = obj.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+                return float(value) / 1000.0 if value > 86400 * 7 else float(value)
+    texts = []
+    for obj in candidates:
+        for key in ("message", "error", "detail"):
+            value = obj.get(key)
+            if isinstance(value, str):
+                texts.append(value)
+            elif isinstance(value, list):
+                texts.extend(str(v) for v in value)
+    if not texts and isinstance(resp.get("raw"), str):
+        texts.append(resp["raw"][:500])
+    for text in texts:
+        seconds = _text_seconds(text)
+        if seconds is not None:
+            return seconds
+    return None
+
+
+class _BumpSlot:
+    __slots__ = ("last_success", "next_at", "failures")
+
+    def __init__(self, last_success: float = 0.0, next_at: float = 0.0, failures: int = 0) -> None:
+        self.last_success = last_success
+        self.next_at = next_at
+        self.failures = failures
+
+
+class BumpScheduler:
+    def __init__(
+        self,
+        db=None,
+        cooldown: float = 1800,
+        retry_delay: float = 300,
+        min_delay: float = 30,
+    ) -> None:
+        self.db = db
+        self.cooldown = max(60.0, float(cooldown))
+        self.retry_delay = max(10.0, float(retry_delay))
+        self.min_delay = max(1.0, float(min_delay))
+        self.slots: dict[tuple[int, int], _BumpSlot] = {}
+        self._log = logging.getLogger("exfador.monitor")
+
+    async def load(self) -> None:
+        if self.db is None:
+            return
+        try:
+            raw = await self.db.get_meta(BUMP_SCHEDULE_KEY)
+            data = json.loads(raw) if raw else {}
+        except Exception as exc:
+            self._log.warning(f"bump_schedule_load_failed error={exc}")
+            return
+        for key, value in (data or {}).items():
+            try:
+                gid, cid = (int(x) for x in key.split(":", 1))
+                last_success, next_at = float(value[0]), float(value[1])
+            except Exception:
+                continue
+            self.slots[(gid, cid)] = _BumpSlot(last_success, next_at)
+
+    async def save(self) -> None:
+        if self.db is None:
+            return
+        data = {f"{gid}:{cid}": [s.last_success, s.next_at] for (gid, cid), s in self.slots.items()}
+        try:
+            await self.db.set_meta(BUMP_SCHEDULE_KEY, json.dumps(data))
+        except Exception as exc:
+            self._log.warning(f"bump_schedule_save_failed error={exc}")
+
+    def due(self, game_to_categories: Mapping[int, frozenset[int]], now: float | None = None) -> dict[int, list[int]]:
+        now = time.time() if now is None else now
+        out: dict[int, list[int]] = {}
+        for gid, categories in game_to_categories.items():
+            ready = [cid for cid in categories if self._slot(gid, cid).next_at <= now]
+            if ready:
+                out[gid] = sorted(ready)
+        return out
+
+    def record(self, game_id: int, category_ids: list[int], response: dict | None, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        resp = response or {}
+        success = bool(resp.get("success"))
+        wait = cooldown_from_response(resp, now)
+        waits: list[float] = []
+        for cid in category_ids:
+            slot = self._slot(game_id, cid)
+            if success:
+                slot.last_success = now
+                slot.failures = 0
+                slot_wait = wait if wait else self.cooldown
+            else:
+                slot.failures += 1
+                slot_wait = wait
+                if slot_wait is None:
+                    slot_wait = min(self.cooldown, self.retry_delay * (2 ** (slot.failures - 1)))
+                slot_wait = max(self.min_delay, slot_wait)
+            slot.next_at = now + slot_wait
+            waits.append(slot_wait)
+        return min(waits) if waits else (wait if wait is not None else self.cooldown)
+
+    def fail(self, game_id: int, category_ids: list[int], now: float | None = None) -> None:
+        self.record(game_id, category_ids, None, now)
+
+    def delay(self, game_to_categories: Mapping[int, frozenset[int]], now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        times = [self._slot(gid, cid).next_at for gid, cats in game_to_categories.items() for cid in cats]
+        if not times:
+            return self.cooldown
+        return min(self.cooldown, max(self.min_delay, min(times) - now))
+
+    def prune(self, game_to_categories: Mapping[int, frozenset[int]]) -> None:
+        keep = {(gid, cid) for gid, cats in game_to_categories.items() for cid in cats}
+        for key in [k for k in self.slots if k not in keep]:
+            del self.slots[key]
+
+    def _slot(self, gid: int, cid: int) -> _BumpSlot:
+        slot = self.slots.get((gid, cid))
+        if slot is None:
+            slot = _BumpSlot()
+            self.slots[(gid, cid)] = slot
+        return slot
+
+    def metrics(self) -> dict:
+        now = time.time()
+        return {
+            f"{gid}:{cid}": {
+                "last_success": s.last_success,
+                "next_in": round(max(0.0, s.next_at - now), 1),
+                "failures": s.failures,
+            }
+            for (gid, cid), s in sorted(self.slots.items())
+        }
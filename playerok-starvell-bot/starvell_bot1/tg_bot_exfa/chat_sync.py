@@ -0,0 +1,95 @@
+import asyncio
+
+from api.messages import fetch_chat_messages
+
+
+class ChatSyncEngine:
+    def __init__(self, db, concurrency: int = 4) -> None:
+        self.db = db
+        self.concurrency = max(1, int(concurrency))
+        self.watermarks: dict[str, str] = {}
+        self._known: dict[str, str] = {}
+        self._dirty: dict[str, str] = {}
+        self._loaded = False
+        self.last_changed = 0
+        self.last_fetched = 0
+        self.participants: dict[str, str] = {}
+
+    async def load(self) -> None:
+        if self._loaded:
+            return
+        self.watermarks = await self.db.get_all_last_notified_messages()
+        self._known = dict(self.watermarks)
+        self._loaded = True
+
+    def watermark(self, chat_id: str) -> str | None:
+        return self.watermarks.get(chat_id)
+
+    def index(self, chats: list) -> None:
+        for chat in reversed(chats or []):
+            if not isinstance(chat, dict):
+                continue
+            chat_id = chat.get("id")
+            if not chat_id:
+                continue
+            for participant in chat.get("participants") or []:
+                pid = (participant or {}).get("id")
+                if pid is not None and not isinstance(pid, bool):
+                    self.participants[str(pid).strip()] = chat_id
+
+    def chat_for_user(self, user_id) -> str | None:
+        if user_id is None or isinstance(user_id, bool):
+            return None
+        return self.participants.get(str(user_id).strip())
+
+    def changed(self, chats: list) -> list[dict]:
+        self.index(chats)
+        out: list[dict] = []
+        for chat in chats or []:
+            if not isinstance(chat, dict):
+                continue
+            chat_id = chat.get("id")
+            msg_id = (chat.get("lastMessage") or {}).get("id")
+            if not chat_id or not msg_id:
+                continue
+            if self._known.get(chat_id) == msg_id:
+                continue
+            out.append(chat)
+        self.last_changed = len(out)
+        return out
+
+    def mark_seen(self, chat_id: str, message_id: str) -> None:
+        self._known[chat_id] = message_id
+
+    def advance(self, chat_id: str, message_id: str) -> None:
+        self.watermarks[chat_id] = message_id
+        self._dirty[chat_id] = message_id
+
+    async def fetch_messages(self, session_cookie: str, chats: list[dict]) -> dict[str, list[dict] | BaseException]:
+        self.last_fetched = len(chats)
+        if not chats:
+            return {}
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def _one(chat: dict) -> list[dict]:
+            async with sem:
+                try:
+                    unread = int(chat.get("unreadMessageCount") or 0)
+                except Exception:
+                    unread = 0
+                return await fetch_chat_messages(session_cookie, chat["id"], limit=max(unread, 50))
+
+        results = await asyncio.gather(*(_one(c) for c in chats), return_exceptions=True)
+        return {c["id"]: r for c, r in zip(chats, results)}
+
+    async def flush(self) -> None:
+        if not self._dirty:
+            return
+        pending = self._dirty
+        self._dirty = {}
+        try:
+            await self.db.set_last_notified_messages(pending)
+        except Exception:
+            for chat_id, message_id in pending.items():
+                self._dirty.setdefault(chat_id, message_id)
+            raise
@@ -2,6 +2,8 @@ import json
 import os
 import hashlib
 
+from tg_bot_exfa.config_store import CONFIG_PATH, get_store
+
 
 class BotConfig:
     def __init__(self, token: str, password_md5: str, default_language: str, path: str,
@@ -37,11 +39,8 @@ def md5_hex(text: str) -> str:
 
 
 def load_config() -> BotConfig:
-    path = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "config", "osnova.json"))
-    data = {}
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    path = CONFIG_PATH
+    data = get_store().snapshot()
     token = os.getenv("BOT_TOKEN") or data.get("BOT_TOKEN", "")
     password_md5 = os.getenv("BOT_PASSWORD_MD5") or data.get("BOT_PASSWORD_MD5", "")
     if not password_md5:
@@ -112,5 +111,6 @@ def save_config(cfg: BotConfig) -> None:
     )
     with open(cfg.path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=4)
+    get_store().reload()
 
 
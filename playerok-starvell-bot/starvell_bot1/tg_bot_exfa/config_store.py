@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
+
+
+CONFIG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "config", "osnova.json"))
+
+Subscriber = Callable[[Mapping[str, Any], Mapping[str, Any]], None]
+
+
+class ConfigStore:
+    def __init__(self, path: str = CONFIG_PATH, check_interval: float = 1.0) -> None:
+        self.path = path
+        self.check_interval = float(check_interval)
+        self.version = 0
+        self._snapshot: Mapping[str, Any] = MappingProxyType({})
+        self._stat_key: tuple | None = None
+        self._bad_key: tuple | None = None
+        self._checked_at = 0.0
+        self._watch_task: asyncio.Task | None = None
+        self._subscribers: list[Subscriber] = []
+        self._log = logging.getLogger("exfador.config")
+
+    def _stat(self) -> tuple | None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def check(self) -> bool:
+        self._checked_at = time.monotonic()
+        key = self._stat()
+        if (key == self._stat_key and self.version) or (key is not None and key == self._bad_key):
+            return False
+        data: dict = {}
+        if key is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f) or {}
+            except Exception as exc:
+                self._bad_key = key
+                self._log.warning(f"config_reload_failed path={self.path} error={exc}")
+                return False
+        self._stat_key = key
+        self._bad_key = None
+        self._publish(data)
+        return True
+
+    def _publish(self, data: dict) -> None:
+        old = self._snapshot
+        new = MappingProxyType(dict(data))
+        self._snapshot = new
+        self.version += 1
+        if self.version == 1:
+            return
+        for callback in list(self._subscribers):
+            try:
+                callback(old, new)
+            except Exception as exc:
+                self._log.warning(f"config_subscriber_failed error={exc}")
+
+    def reload(self) -> Mapping[str, Any]:
+        self._stat_key = None
+        self._bad_key = None
+        self.check()
+        return self._snapshot
+
+    def snapshot(self) -> Mapping[str, Any]:
+        watching = self._watch_task is not None and not self._watch_task.done()
+        if not self.version or (not watching and time.monotonic() - self._checked_at >= self.check_interval):
+            self.check()
+        return self._snapshot
+
+    def subscribe(self, callback: Subscriber) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                self.check()
+            except Exception as exc:
+                self._log.warning(f"config_watch_failed error={exc}")
+            await asyncio.sleep(self.check_interval)
+
+    def start_watch(self) -> asyncio.Task:
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.get_running_loop().create_task(self._watch())
+        return self._watch_task
+
+    def stop_watch(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+
+_store: ConfigStore | None = None
+
+
+def get_store() -> ConfigStore:
+    global _store
+    if _store is None:
+        _store = ConfigStore()
+    return _store
+
+
+def config_snapshot() -> Mapping[str, Any]:
+    return get_store().snapshot()
@@ -105,6 +105,7 @@ class Translations:
                 "templates_page": "Страница {current} из {total}.",
                 "stats_title": "📊 Статистика продаж",
                 "stats_loading": "Загружаю статистику…",
+                "stats_history_loading": "⏳ История заказов ещё загружается — цифры могут быть неполными.",
                 "stats_period_day": "За 24 часа",
                 "stats_period_week": "За 7 дней",
                 "stats_period_all": "За всё время",
@@ -181,6 +182,7 @@ class Translations:
                 "ad_add_prompt_name": "Введите название товара:",
                 "ad_add_prompt_file": "Отправьте .txt файл с данными (каждая позиция с новой строки). Поддерживается формат value или value:count.",
                 "ad_added_result": "Добавлено: <code>{count}</code> шт. для товара <code>{name}</code>",
+                "ad_add_progress": "Загрузка товара <code>{name}</code>: {percent}% · добавлено <code>{count}</code> шт.",
                 "ad_cancel": "Отменено",
                 "ad_list_title": "⚡ Автовыдача — список товаров",
                 "ad_list_empty": "Список пуст.",
@@ -294,6 +296,7 @@ class Translations:
                 "templates_page": "Page {current} of {total}.",
                 "stats_title": "📊 Sales statistics",
                 "stats_loading": "Loading statistics…",
+                "stats_history_loading": "⏳ Order history is still loading — figures may be incomplete.",
                 "stats_period_day": "Last 24 hours",
                 "stats_period_week": "Last 7 days",
                 "stats_period_all": "All time",
@@ -370,6 +373,7 @@ class Translations:
                 "ad_add_prompt_name": "Enter product name:",
                 "ad_add_prompt_file": "Send .txt file with data (each item on a new line). Supported: value or value:count.",
                 "ad_added_result": "Added: <code>{count}</code> items for <code>{name}</code>",
+                "ad_add_progress": "Uploading <code>{name}</code>: {percent}% · added <code>{count}</code> items",
                 "ad_cancel": "Cancelled",
                 "ad_list_title": "⚡ Autodelivery — products",
                 "ad_list_empty": "No products.",
@@ -1,3 +1,4 @@
+import asyncio
 import html
 import logging
 import math
@@ -9,9 +10,8 @@ from aiogram.types import CallbackQuery, Message, InlineKeyboardButton, InlineKe
 from aiogram.exceptions import TelegramBadRequest
 
 import tg_bot_exfa.app as app
-from api.auth import fetch_homepage_data
-from api.find_lots_user import find_user_lots
-from api.orders import refund_order, fetch_sells_all
+from api.session import get_session, is_auth_error
+from api.orders import refund_order
 from api.send_message import send_chat_message, send_chat_image
 from tg_bot_exfa.exf_langue.strings import Translations
 from tg_bot_exfa.keyboards.menus import Keyboards
@@ -22,6 +22,10 @@ from tg_bot_exfa.states.orders import OrderRefund
 from tg_bot_exfa.states.autodelivery import AutodeliveryFlow
 from tg_bot_exfa.monitor import load_config as load_osnova_config
 from tg_bot_exfa.config import save_config
+from tg_bot_exfa.config_store import get_store as get_config_store
+from tg_bot_exfa.utils.http import get_json
+from tg_bot_exfa.utils.stock_file import iter_stock_chunks
+from tg_bot_exfa.order_history import backfill_complete, ensure_backfill
 
 
 router = Router()
@@ -32,6 +36,7 @@ log = logging.getLogger("exfador.handlers")
 TEMPLATES_PAGE_SIZE = 5
 TEMPLATE_LIST_PREVIEW = 120
 TEMPLATE_BUTTON_PREVIEW = 40
+STATS_BACKFILL_WAIT = 20
 
 
 def _preview_text(text: str | None, limit: int) -> str:
@@ -95,6 +100,14 @@ async def _safe_edit_callback_message(message: Message, text: str, reply_markup)
     await message.edit_caption(caption=text or " ", reply_markup=reply_markup)
 
 
+async def _session_cookies(session_cookie: str, force: bool = False) -> tuple[str | None, str | None]:
+    try:
+        auth = await get_session().get(session_cookie, need_my_games=True, force=force)
+    except Exception:
+        return None, None
+    return (auth or {}).get("sid"), (auth or {}).get("my_games")
+
+
 async def _send_reply_from_state(
     bot,
     state: FSMContext,
@@ -116,24 +129,7 @@ async def _send_reply_from_state(
     session_cookie = session_cfg.get("SESSION_COOKIE", "")
     if not session_cookie:
         return False, "SESSION_COOKIE missing", chat_id
-    sid_cookie = None
-    my_games_cookie = None
-    try:
-        auth = await fetch_homepage_data(session_cookie)
-        sid_cookie = (auth or {}).get("sid")
-        my_games_cookie = (auth or {}).get("my_games")
-        if not my_games_cookie:
-            uid = ((auth or {}).get("user") or {}).get("id")
-            try:
-                uid_int = int(uid)
-            except Exception:
-                uid_int = None
-            if uid_int:
-                lots_data = await find_user_lots(session_cookie, sid_cookie or "", uid_int)
-                my_games_cookie = (lots_data or {}).get("my_games") or my_games_cookie
-    except Exception:
-        sid_cookie = None
-        my_games_cookie = None
+    sid_cookie, my_games_cookie = await _session_cookies(session_cookie)
     try:
         cfg = app.app_context.config
         if getattr(cfg, "watermark_on", True):
@@ -142,7 +138,13 @@ async def _send_reply_from_state(
     except Exception:
         pass
     try:
-        await send_chat_message(session_cookie, chat_id, content, my_games_cookie=my_games_cookie)
+        try:
+            await send_chat_message(session_cookie, chat_id, content, my_games_cookie=my_games_cookie)
+        except Exception as exc:
+            if not is_auth_error(exc):
+                raise
+            sid_cookie, my_games_cookie = await _session_cookies(session_cookie, force=True)
+            await send_chat_message(session_cookie, chat_id, content, my_games_cookie=my_games_cookie)
     except Exception as exc:
         return False, str(exc), chat_id
     notification_chat_id = data.get("notification_chat_id") or default_chat_id
@@ -221,24 +223,7 @@ async def _send_reply_image_from_state(
     session_cookie = session_cfg.get("SESSION_COOKIE", "")
     if not session_cookie:
         return False, "SESSION_COOKIE missing", chat_id
-    sid_cookie = None
-    my_games_cookie = None
-    try:
-        auth = await fetch_homepage_data(session_cookie)
-        sid_cookie = (auth or {}).get("sid")
-        my_games_cookie = (auth or {}).get("my_games")
-        if not my_games_cookie:
-            uid = ((auth or {}).get("user") or {}).get("id")
-            try:
-                uid_int = int(uid)
-            except Exception:
-                uid_int = None
-            if uid_int:
-                lots_data = await find_user_lots(session_cookie, sid_cookie or "", uid_int)
-                my_games_cookie = (lots_data or {}).get("my_games") or my_games_cookie
-    except Exception:
-        sid_cookie = None
-        my_games_cookie = None
+    sid_cookie, my_games_cookie = await _session_cookies(session_cookie)
     try:
         cfg = app.app_context.config
         if caption and getattr(cfg, "watermark_on", True):
@@ -246,19 +231,24 @@ async def _send_reply_image_from_state(
             caption = f"{prefix}\n\n{caption}"
     except Exception:
         pass
-    try:
-        await send_chat_image(
-            session_cookie,
-            chat_id,
-            image_bytes=image_bytes,
-            filename=filename,
-            content_type=content_type,
-            content=caption,
-            sid_cookie=sid_cookie,
-            my_games_cookie=my_games_cookie,
-        )
-    except Exception as exc:
-        return False, str(exc), chat_id
+    for attempt in range(2):
+        try:
+            await send_chat_image(
+                session_cookie,
+                chat_id,
+                image_bytes=image_bytes,
+                filename=filename,
+                content_type=content_type,
+                content=caption,
+                sid_cookie=sid_cookie,
+                my_games_cookie=my_games_cookie,
+            )
+            break
+        except Exception as exc:
+            if attempt == 0 and is_auth_error(exc):
+                sid_cookie, my_games_cookie = await _session_cookies(session_cookie, force=True)
+                continue
+            return False, str(exc), chat_id
     notification_chat_id = data.get("notification_chat_id") or default_chat_id
     notification_message_id = data.get("notification_message_id") or default_message_id
     original_kind = data.get("original_kind") or "text"
@@ -376,7 +366,30 @@ async def open_stats(callback: CallbackQuery):
             except Exception:
                 pass
             return
-        orders = await fetch_sells_all(session_cookie)
+        try:
+            poll_interval = float(session_cfg.get("ORDERS_POLL_INTERVAL", 10))
+        except Exception:
+            poll_interval = 10.0
+        task = ensure_backfill(session_cookie, db, min_interval=max(poll_interval, 1.0))
+        history_complete = await backfill_complete(db)
+        if not history_complete:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=STATS_BACKFILL_WAIT)
+            except Exception:
+                pass
+            history_complete = await backfill_complete(db)
+        now_ts = int(datetime.now(timezone.utc).timestamp())
+        periods = {
+            "day": now_ts - int(timedelta(days=1).total_seconds()),
+            "week": now_ts - int(timedelta(days=7).total_seconds()),
+            "all": 0,
+        }
+        counts: dict[str, dict[str, int]] = {}
+        sums: dict[str, dict[str, int]] = {}
+        for key, since in periods.items():
+            stats = await db.order_stats(since)
+            counts[key] = {status: cnt for status, (cnt, _total) in stats.items()}
+            sums[key] = {status: total for status, (_cnt, total) in stats.items()}
     except Exception as exc:
         try:
             await callback.message.edit_text(tr.t(lang, "reply_failed", error=str(exc)))
@@ -384,46 +397,6 @@ async def open_stats(callback: CallbackQuery):
             pass
         return
 
-    now = datetime.now(timezone.utc)
-
-    def parse_dt(ts: str | None) -> datetime | None:
-        if not ts:
-            return None
-        try:
-            if ts.endswith("Z"):
-                return datetime.fromisoformat(ts.replace("Z", "+00:00")).astimezone(timezone.utc)
-            return datetime.fromisoformat(ts).astimezone(timezone.utc)
-        except Exception:
-            return None
-
-    periods = {
-        "day": now - timedelta(days=1),
-        "week": now - timedelta(days=7),
-        "all": datetime.min.replace(tzinfo=timezone.utc),
-    }
-
-    counts: dict[str, dict[str, int]] = {k: {"COMPLETED": 0, "REFUND": 0, "CREATED": 0} for k in periods.keys()}
-    sums: dict[str, dict[str, int]] = {k: {"COMPLETED": 0, "REFUND": 0, "CREATED": 0} for k in periods.keys()}
-
-    for order in orders:
-        status = (order or {}).get("status") or ""
-        created_at = parse_dt((order or {}).get("createdAt"))
-        price_raw = (order or {}).get("totalPrice") or (order or {}).get("basePrice") or 0
-        try:
-            price_val = int(price_raw)
-        except Exception:
-            try:
-                price_val = int(float(price_raw))
-            except Exception:
-                price_val = 0
-        if created_at is None:
-            continue
-        for key, since in periods.items():
-            if created_at >= since:
-                if status in counts[key]:
-                    counts[key][status] += 1
-                    sums[key][status] += price_val
-
     def fmt_rub(value_int: int) -> str:
         try:
             return f"{(value_int or 0)/100:.2f}"
@@ -431,6 +404,8 @@ async def open_stats(callback: CallbackQuery):
             return "0.00"
 
     lines: list[str] = [tr.t(lang, "stats_title")]
+    if not history_complete:
+        lines.append(tr.t(lang, "stats_history_loading"))
     lines.append("")
     lines.append(f"<b>{tr.t(lang, 'stats_period_day')}:</b>")
     lines.append(tr.t(
@@ -1003,6 +978,7 @@ async def on_change_session(message: Message, state: FSMContext):
             obj = json.loads(cfg_path.read_text(encoding="utf-8") or "{}")
         obj["SESSION_COOKIE"] = new_session
         cfg_path.write_text(json.dumps(obj, ensure_ascii=False, indent=4), encoding="utf-8")
+        get_config_store().reload()
     except Exception as exc:
         await message.bot.edit_message_text(
             tr.t(lang, "session_change_failed", error=str(exc)),
@@ -1353,7 +1329,9 @@ async def ad_on_name(message: Message, state: FSMContext):
 
 @router.message(AutodeliveryFlow.waiting_file, F.document)
 async def ad_on_file(message: Message, state: FSMContext):
-    import io
+    import os
+    import tempfile
+    import time
     db = app.app_context.db
     cfg = app.app_context.config
     user = await db.get_user(message.from_user.id)
@@ -1374,40 +1352,52 @@ async def ad_on_file(message: Message, state: FSMContext):
             ),
         )
         return
-    buf = io.BytesIO()
+    fd, tmp_path = tempfile.mkstemp(prefix="ad_", suffix=".txt")
+    os.close(fd)
+    chunks = None
     try:
-        await message.bot.download(message.document, destination=buf)
-    except Exception:
-        await message.bot.edit_message_text(
-            tr.t(lang, "ad_add_prompt_file"),
-            chat_id=message.chat.id,
-            message_id=last_message_id,
-            reply_markup=(
-                kb.ad_add_to_item(lambda k: tr.t(lang, k), return_item_id).as_markup()
-                if return_item_id else
-                kb.ad_add(lambda k: tr.t(lang, k)).as_markup()
-            ),
-        )
-        return
-    raw = buf.getvalue().decode("utf-8", errors="ignore")
-    values: list[str] = []
-    for line in raw.splitlines():
-        s = (line or "").strip()
-        if not s:
-            continue
-        if ":" in s:
-            left, right = s.split(":", 1)
-            left = left.strip()
-            try:
-                count = int((right or "").strip())
-            except Exception:
-                count = 1
-            for _ in range(max(0, count)):
-                if left:
-                    values.append(left)
-        else:
-            values.append(s)
-    added = await db.add_autodelivery_items(name, values)
+        try:
+            await message.bot.download(message.document, destination=tmp_path)
+        except Exception:
+            await message.bot.edit_message_text(
+                tr.t(lang, "ad_add_prompt_file"),
+                chat_id=message.chat.id,
+                message_id=last_message_id,
+                reply_markup=(
+                    kb.ad_add_to_item(lambda k: tr.t(lang, k), return_item_id).as_markup()
+                    if return_item_id else
+                    kb.ad_add(lambda k: tr.t(lang, k)).as_markup()
+                ),
+            )
+            return
+        total = max(1, os.path.getsize(tmp_path))
+        added = 0
+        last_progress = time.monotonic()
+        chunks = iter_stock_chunks(tmp_path)
+        while True:
+            item = await asyncio.to_thread(next, chunks, None)
+            if item is None:
+                break
+            rows, pos = item
+            added += await db.add_autodelivery_counts(name, rows)
+            now = time.monotonic()
+            if now - last_progress >= 2.0:
+                last_progress = now
+                try:
+                    await message.bot.edit_message_text(
+                        tr.t(lang, "ad_add_progress", name=name, percent=min(100, pos * 100 // total), count=added),
+                        chat_id=message.chat.id,
+                        message_id=last_message_id,
+                    )
+                except Exception:
+                    pass
+    finally:
+        if chunks is not None:
+            chunks.close()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
     if return_item_id:
         left = await db.count_autodelivery(name)
         await state.update_data(ad_return_item_id=None)
@@ -1614,19 +1604,18 @@ async def open_info(callback: CallbackQuery):
         return total
 
     root = Path(__file__).resolve().parents[2]
-    size_bytes = _calc_project_size_bytes(root)
+    size_bytes = await asyncio.to_thread(_calc_project_size_bytes, root)
     size_mb = max(0.0, size_bytes / (1024 * 1024))
 
     latest = "—"
     try:
-        import requests 
-        r = requests.get(
+        status, arr = await get_json(
             "https://api.github.com/repos/exfador/starvell_api/tags?page=1",
             headers={"accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"},
             timeout=5,
         )
-        if r.status_code == 200:
-            for it in (r.json() or []):
+        if status == 200:
+            for it in (arr or []):
                 name = str((it or {}).get("name") or "").strip()
                 if name and name.lower() != "api":
                     latest = name
@@ -2291,14 +2280,13 @@ async def install_update(callback: CallbackQuery):
         pass
     zip_url = None
     try:
-        import requests
-        r = requests.get(
+        status, arr = await get_json(
             "https://api.github.com/repos/exfador/starvell_api/tags?page=1",
             headers={"accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"},
             timeout=10,
         )
-        if r.status_code == 200:
-            for it in r.json() or []:
+        if status == 200:
+            for it in arr or []:
                 if str((it or {}).get("name") or "").strip() == tag_name:
                     zip_url = str((it or {}).get("zipball_url") or "").strip()
                     break
@@ -2324,8 +2312,10 @@ async def install_update(callback: CallbackQuery):
                         break
                     f.write(chunk)
     try:
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            zf.extractall(tmp_dir)
+        def _extract() -> None:
+            with zipfile.ZipFile(zip_path, "r") as zf:
+                zf.extractall(tmp_dir)
+        await asyncio.to_thread(_extract)
     except Exception as exc:
         shutil.rmtree(tmp_dir, ignore_errors=True)
         await callback.answer("Распаковка не удалась", show_alert=True)
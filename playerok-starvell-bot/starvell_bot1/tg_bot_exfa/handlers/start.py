@@ -155,8 +155,8 @@ async def on_change_password(message: Message, state: FSMContext):
 
 @router.message(Command("update"))
 async def cmd_update(message: Message):
-    import requests
     from version import VERSION
+    from tg_bot_exfa.utils.http import get_json
     db = app.app_context.db
     cfg = app.app_context.config
     user = await db.get_user(message.from_user.id)
@@ -165,13 +165,13 @@ async def cmd_update(message: Message):
     lang = user.get("language") or cfg.default_language
     latest = None
     try:
-        r = requests.get(
+        status, arr = await get_json(
             "https://api.github.com/repos/exfador/starvell_api/tags?page=1",
             headers={"accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"},
             timeout=10,
         )
-        if r.status_code == 200:
-            for it in (r.json() or []):
+        if status == 200:
+            for it in (arr or []):
                 name = str((it or {}).get("name") or "").strip()
                 if name and name.lower() != "api":
                     latest = name
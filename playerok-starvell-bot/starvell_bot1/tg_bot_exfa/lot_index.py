@@ -0,0 +1,157 @@
+import hashlib
+import json
+from types import MappingProxyType
+from typing import Iterator, Mapping
+
+from api.models import Lot
+
+
+class LotRecord:
+    __slots__ = ("offer_id", "game_id", "category_id", "lot")
+
+    def __init__(self, offer_id: int, lot: Lot) -> None:
+        self.offer_id = offer_id
+        self.game_id: int | None = None
+        self.category_id: int | None = None
+        self.lot = lot
+
+    def as_dict(self) -> dict:
+        out = self.lot.as_dict()
+        out["category_id"] = self.category_id
+        out["game_id"] = self.game_id
+        return out
+
+
+def _int(value) -> int | None:
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class LotIndex:
+    def __init__(self) -> None:
+        self.records: dict[int, LotRecord] = {}
+        self.digest: str | None = None
+        self._untracked: list[Lot] = []
+        self._pairs: dict[tuple[int, int], int] = {}
+        self._games: dict[int, frozenset[int]] = {}
+        self._by_category: dict[int, dict[int, LotRecord]] = {}
+        self._games_view: Mapping[int, frozenset[int]] = MappingProxyType(self._games)
+        self._lot_url: str | None = None
+        self._meta_url: str | None = None
+
+    @classmethod
+    def build(cls, lots: list[Lot]) -> "LotIndex":
+        index = cls()
+        index.update(lots)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def game_to_categories(self) -> Mapping[int, frozenset[int]]:
+        return self._games_view
+
+    @property
+    def category_url(self) -> str | None:
+        return self._lot_url or self._meta_url
+
+    def update(self, lots: list[Lot]) -> bool:
+        seen: set[int] = set()
+        items = []
+        untracked = []
+        lot_url = None
+        for lot in lots or []:
+            oid = _int(lot.id)
+            gid = _int(lot.game_id)
+            cid = _int(lot.category_id)
+            if lot.id is not None:
+                items.append((str(lot.id), gid, cid))
+            if lot_url is None:
+                cu = lot.category_url
+                if isinstance(cu, str) and cu.strip():
+                    lot_url = cu.strip()
+            if oid is None:
+                untracked.append(lot)
+                continue
+            seen.add(oid)
+            rec = self.records.get(oid)
+            if rec is None:
+                rec = LotRecord(oid, lot)
+                self.records[oid] = rec
+            else:
+                rec.lot = lot
+            self.set_ids(oid, gid if gid is not None else rec.game_id, cid if cid is not None else rec.category_id)
+        for oid in [oid for oid in self.records if oid not in seen]:
+            self._unlink(self.records.pop(oid))
+        self._untracked = untracked
+        self._lot_url = lot_url
+        items.sort()
+        digest = hashlib.sha1(json.dumps(items, default=str).encode("utf-8")).hexdigest()
+        changed = digest != self.digest
+        self.digest = digest
+        return changed
+
+    def set_ids(self, offer_id: int, game_id: int | None, category_id: int | None) -> None:
+        rec = self.records.get(offer_id)
+        if rec is None or (rec.game_id == game_id and rec.category_id == category_id):
+            return
+        self._unlink(rec)
+        rec.game_id = game_id
+        rec.category_id = category_id
+        self._link(rec)
+
+    def apply_meta(self, details: Mapping[int, Mapping]) -> None:
+        for oid, meta in details.items():
+            rec = self.records.get(oid)
+            if rec is None:
+                continue
+            gid = _int(meta.get("game_id"))
+            cid = _int(meta.get("category_id"))
+            self.set_ids(oid, gid if gid is not None else rec.game_id, cid if cid is not None else rec.category_id)
+            gslug = meta.get("game_slug")
+            cslug = meta.get("category_slug")
+            if gslug and cslug and not self._meta_url:
+                self._meta_url = f"https://starvell.com/{gslug}/{cslug}/trade"
+
+    def missing(self) -> list[int]:
+        return [oid for oid, rec in self.records.items() if rec.game_id is None or rec.category_id is None]
+
+    def in_category(self, category_id: int) -> Iterator[LotRecord]:
+        return iter(list((self._by_category.get(category_id) or {}).values()))
+
+    def lots(self) -> list[dict]:
+        return [rec.as_dict() for rec in self.records.values()] + [lot.as_dict() for lot in self._untracked]
+
+    def _link(self, rec: LotRecord) -> None:
+        if rec.category_id is not None:
+            self._by_category.setdefault(rec.category_id, {})[rec.offer_id] = rec
+        if rec.game_id is None or rec.category_id is None:
+            return
+        key = (rec.game_id, rec.category_id)
+        n = self._pairs.get(key, 0)
+        self._pairs[key] = n + 1
+        if n == 0:
+            self._games[rec.game_id] = self._games.get(rec.game_id, frozenset()) | {rec.category_id}
+
+    def _unlink(self, rec: LotRecord) -> None:
+        if rec.category_id is not None:
+            bucket = self._by_category.get(rec.category_id)
+            if bucket is not None:
+                bucket.pop(rec.offer_id, None)
+                if not bucket:
+                    del self._by_category[rec.category_id]
+        if rec.game_id is None or rec.category_id is None:
+            return
+        key = (rec.game_id, rec.category_id)
+        n = self._pairs.get(key, 0) - 1
+        if n > 0:
+            self._pairs[key] = n
+            return
+        self._pairs.pop(key, None)
+        cats = self._games.get(rec.game_id)
+        if cats is not None:
+            cats = cats - {rec.category_id}
+            if cats:
+                self._games[rec.game_id] = cats
+            else:
+                del self._games[rec.game_id]
@@ -5,12 +5,13 @@ from typing import Any
 import logging
 import time
 
-from api.auth import fetch_homepage_data
+from api.session import AUTH_ERROR_STATUSES, get_session
 from api.find_lots_user import find_user_lots
-from api.offer_details import fetch_offer_detail
+from api.models import Chat, Message, Order, normalize_id, parse_messages
 from api.bump import bump_categories
 from api.chats import fetch_chats
-from api.messages import fetch_chat_messages
+from api.conditional import get_validator, poll_metrics
+from api.json_codec import json_metrics
 from api.orders import fetch_sells
 from api.send_message import send_chat_message
 from tg_bot_exfa.notify import send_order_notification
@@ -18,26 +19,24 @@ from tg_bot_exfa.notify import send_auth_notification, send_bump_notification
 from tg_bot_exfa.notify import send_chat_notification, send_order_completed_notification
 from tg_bot_exfa.notify import sync_digest_view
 import tg_bot_exfa.app as app
-import requests
 from version import VERSION
 from tg_bot_exfa.notify import send_update_available
 from tg_bot_exfa.plugins import PluginContext
-from api.rate_limiter import throttle_sync
-
-
-def _normalize_id(value):
-    if value is None:
-        return None
-    if isinstance(value, bool):
-        return None
-    if isinstance(value, (int, str)):
-        return str(value).strip()
-    return None
+from tg_bot_exfa.bump_scheduler import BumpScheduler
+from tg_bot_exfa.chat_sync import ChatSyncEngine
+from tg_bot_exfa.lot_index import LotIndex
+from tg_bot_exfa.config_store import config_snapshot
+from tg_bot_exfa.offer_meta import OFFER_DETAIL_CONCURRENCY, OFFER_META_TTL, forget_missing_offers, resolve_offer_meta
+from tg_bot_exfa.order_history import ensure_backfill
+from tg_bot_exfa.orders_pipeline import load_order_plan, order_history_rows
+from tg_bot_exfa.poll_scheduler import AdaptivePollScheduler, register_scheduler, scheduler_metrics
+from tg_bot_exfa.utils.http import get_json, get_text
+from tg_bot_exfa.utils.loop_watchdog import loop_watchdog_metrics
+from api.rate_limiter import PRIORITY_BUMP, PRIORITY_CHATS, PRIORITY_ORDERS, limiter_metrics, set_priority, use_priority
 
 
 def load_config() -> dict:
-    with open("config/osnova.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+    return dict(config_snapshot())
 
 
 async def start_monitor() -> None:
@@ -49,9 +48,9 @@ async def start_monitor() -> None:
 
 
 async def _monitor_once_and_loop() -> None:
-    cfg = load_config()
+    cfg = config_snapshot()
     session_cookie = cfg.get("SESSION_COOKIE", "")
-    auth = await fetch_homepage_data(session_cookie)
+    auth = await get_session().get(session_cookie)
     if not (auth.get("authorized") and auth.get("user")):
         try:
             await send_auth_notification(False)
@@ -68,139 +67,150 @@ async def _monitor_once_and_loop() -> None:
     lots_data = await find_user_lots(session_cookie, sid_cookie, user_id)
     lots = (lots_data or {}).get("lots") or []
     my_games_cookie = (lots_data or {}).get("my_games")
-    category_url = None
-    category_id_by_offer: dict[int, int] = {}
-    game_ids_by_offer: dict[int, int] = {}
-    if lots:
-        for lot in lots:
-            oid = lot.get("id")
-            if not category_url:
-                cu = lot.get("category_url")
-                if isinstance(cu, str) and cu.strip():
-                    category_url = cu.strip()
-            if not isinstance(oid, int):
-                continue
-            cid = lot.get("category_id")
-            gid = lot.get("game_id")
-            if isinstance(cid, int):
-                category_id_by_offer[oid] = cid
-            if isinstance(gid, int):
-                game_ids_by_offer[oid] = gid
-
-        need_details = [
-            lot
-            for lot in lots
-            if isinstance(lot.get("id"), int)
-            and (lot["id"] not in category_id_by_offer or lot["id"] not in game_ids_by_offer)
-        ]
-        if need_details:
-            tasks = [fetch_offer_detail(session_cookie, lot.get("id"), sid_cookie, my_games_cookie=my_games_cookie) for lot in need_details]
-            details = await asyncio.gather(*tasks, return_exceptions=True)
-            for d in details:
-                if isinstance(d, Exception):
-                    continue
-                page_props = (d or {}).get("pageProps", {})
-                offer = page_props.get("offer") or {}
-                game = offer.get("game") or {}
-                category = offer.get("category") or {}
-                oid = offer.get("id")
-                cid = None
-                if isinstance(category.get("id"), int):
-                    cid = category.get("id")
-                elif isinstance(offer.get("categoryId"), int):
-                    cid = offer.get("categoryId")
-                if isinstance(oid, int) and isinstance(cid, int):
-                    category_id_by_offer[oid] = cid
-                gid = None
-                if isinstance(offer.get("gameId"), int):
-                    gid = offer.get("gameId")
-                elif isinstance(game.get("id"), int):
-                    gid = game.get("id")
-                if isinstance(oid, int) and isinstance(gid, int):
-                    game_ids_by_offer[oid] = gid
-                gslug = game.get("slug")
-                cslug = category.get("slug")
-                if gslug and cslug and not category_url:
-                    category_url = f"https://starvell.com/{gslug}/{cslug}/trade"
-    enriched_lots = []
-    for lot in lots:
-        if isinstance(lot.get("id"), int) and lot["id"] in category_id_by_offer:
-            new_lot = dict(lot)
-            new_lot["category_id"] = category_id_by_offer[lot["id"]]
-            enriched_lots.append(new_lot)
-        else:
-            enriched_lots.append(lot)
+    db = app.app_context.db
+    get_session().remember(session_cookie, my_games=my_games_cookie)
+    chat_sync = ChatSyncEngine(db, concurrency=cfg.get("CHAT_FETCH_CONCURRENCY", 4))
+    with use_priority(PRIORITY_CHATS):
+        user_id = await _check_chats(session_cookie, db, chat_sync, user_id=user_id)
+    chat_scheduler = register_scheduler(
+        AdaptivePollScheduler(
+            "chats",
+            cfg.get("CHAT_POLL_INTERVAL", 5),
+            min_interval=cfg.get("CHAT_POLL_MIN_INTERVAL", 2),
+            max_interval=cfg.get("CHAT_POLL_MAX_INTERVAL", 15),
+            budget_share=0.4,
+        )
+    )
+    orders_scheduler = register_scheduler(
+        AdaptivePollScheduler(
+            "orders",
+            cfg.get("ORDERS_POLL_INTERVAL", 10),
+            min_interval=cfg.get("ORDERS_POLL_MIN_INTERVAL", 3),
+            max_interval=cfg.get("ORDERS_POLL_MAX_INTERVAL", 30),
+            budget_share=0.2,
+        )
+    )
+    asyncio.create_task(
+        _chat_poll_loop(db, user_id=user_id, sync=chat_sync, scheduler=chat_scheduler, orders_scheduler=orders_scheduler)
+    )
+    asyncio.create_task(_orders_poll_loop(db, scheduler=orders_scheduler, sync=chat_sync))
+    ensure_backfill(session_cookie, db)
+    announce_interval = cfg.get("REMOTE_INFO_INTERVAL", 120)
+    asyncio.create_task(_remote_poll_loop(interval=announce_interval))
+    asyncio.create_task(_version_poll_loop(interval=300))
+    metrics_interval = cfg.get("METRICS_LOG_INTERVAL", 300)
+    if metrics_interval:
+        asyncio.create_task(_metrics_log_loop(interval=metrics_interval))
+    lot_index = LotIndex()
+    await _refresh_lot_index(lot_index, lots, session_cookie, sid_cookie, db, cfg, my_games_cookie)
+    category_url = lot_index.category_url
     if cfg.get("DEBUG", True):
         logging.getLogger("exfador.monitor").info(
             json.dumps(
                 {
                     "authorized": True,
                     "user": auth.get("user"),
-                    "lots": enriched_lots,
+                    "lots": lot_index.lots(),
                     "category_url": category_url,
                 },
                 ensure_ascii=False,
                 indent=4,
             )
         )
-    game_to_categories: dict[int, set[int]] = {}
-    for lot in enriched_lots:
-        oid = lot.get("id")
-        cid = lot.get("category_id")
-        gid = game_ids_by_offer.get(oid) or lot.get("game_id")
-        if isinstance(gid, int) and isinstance(cid, int):
-            game_to_categories.setdefault(gid, set()).add(cid)
-    db = app.app_context.db
-    user_id = await _check_chats(session_cookie, db, user_id=user_id)
-    poll_interval = cfg.get("CHAT_POLL_INTERVAL", 5)
-    asyncio.create_task(_chat_poll_loop(db, user_id=user_id, interval=poll_interval))
-    orders_interval = cfg.get("ORDERS_POLL_INTERVAL", 10)
-    asyncio.create_task(_orders_poll_loop(db, interval=orders_interval))
-    announce_interval = cfg.get("REMOTE_INFO_INTERVAL", 120)
-    asyncio.create_task(_remote_poll_loop(interval=announce_interval))
-    asyncio.create_task(_version_poll_loop(interval=300))
-    if game_to_categories:
+    if lot_index.game_to_categories:
         await _run_bump_loop(
             session_cookie,
             sid_cookie,
-            game_to_categories,
+            lot_index,
             category_url,
-            enriched_lots,
             auth.get("user"),
             db,
             my_games_cookie=my_games_cookie,
         )
 
 
-async def _chat_poll_loop(db, user_id, interval: float = 30) -> None:
+async def _refresh_lot_index(
+    lot_index: LotIndex,
+    lots: list[dict],
+    session_cookie: str,
+    sid_cookie: str | None,
+    db,
+    cfg,
+    my_games_cookie: str | None = None,
+) -> bool:
+    changed = lot_index.update(lots)
+    if changed:
+        await forget_missing_offers(lots, db)
+    missing = lot_index.missing()
+    if missing:
+        details = await resolve_offer_meta(
+            session_cookie,
+            sid_cookie,
+            missing,
+            db,
+            my_games_cookie=my_games_cookie,
+            ttl=cfg.get("OFFER_META_TTL", OFFER_META_TTL),
+            concurrency=cfg.get("OFFER_DETAIL_CONCURRENCY", OFFER_DETAIL_CONCURRENCY),
+        )
+        lot_index.apply_meta(details)
+    return changed
+
+
+async def _chat_poll_loop(
+    db,
+    user_id,
+    interval: float = 30,
+    sync: ChatSyncEngine | None = None,
+    scheduler: AdaptivePollScheduler | None = None,
+    orders_scheduler: AdaptivePollScheduler | None = None,
+) -> None:
     log = logging.getLogger("exfador.monitor")
-    seen_messages: dict[str, set[str]] = {}
+    set_priority(PRIORITY_CHATS)
+    if sync is None:
+        sync = ChatSyncEngine(db)
+    if scheduler is None:
+        scheduler = AdaptivePollScheduler("chats", interval, min_interval=interval, max_interval=interval)
     while True:
+        sync.last_changed = 0
+        sync.last_fetched = 0
         try:
-            cfg = load_config()
+            cfg = config_snapshot()
             session_cookie = cfg.get("SESSION_COOKIE", "")
             if session_cookie:
-                user_id = await _check_chats(session_cookie, db, seen_messages, user_id=user_id)
+                user_id = await _check_chats(session_cookie, db, sync, user_id=user_id)
             else:
                 log.warning("chat_poll_no_session_cookie")
         except Exception as exc:
             log.warning(f"chat_poll_failed error={exc}")
-        await asyncio.sleep(max(1, float(interval)))
+        delay = scheduler.record(sync.last_changed > 0, requests=1 + sync.last_fetched)
+        if sync.last_changed > 0 and orders_scheduler is not None:
+            orders_scheduler.wake()
+        await asyncio.sleep(delay)
 
 
-async def _orders_poll_loop(db, interval: float = 15) -> None:
+async def _orders_poll_loop(
+    db,
+    interval: float = 15,
+    scheduler: AdaptivePollScheduler | None = None,
+    sync: ChatSyncEngine | None = None,
+) -> None:
     log = logging.getLogger("exfador.monitor")
+    set_priority(PRIORITY_ORDERS)
+    if scheduler is None:
+        scheduler = AdaptivePollScheduler("orders", interval, min_interval=interval, max_interval=interval)
     while True:
+        activity = 0
         try:
-            cfg = load_config()
+            cfg = config_snapshot()
             session_cookie = cfg.get("SESSION_COOKIE", "")
             if session_cookie:
-                await _check_orders(session_cookie, db)
+                activity = await _check_orders(session_cookie, db, sync)
             else:
                 log.warning("orders_poll_no_session_cookie")
         except Exception as exc:
             log.warning(f"orders_poll_failed error={exc}")
-        await asyncio.sleep(max(1, float(interval)))
+        delay = scheduler.record(bool(activity))
+        await scheduler.sleep(delay)
 
 
 async def _remote_poll_loop(interval: float = 120) -> None:
@@ -225,19 +235,18 @@ async def _remote_poll_loop(interval: float = 120) -> None:
         updated = str((gist_meta or {}).get("updated_at") or "")
         return f"{updated}:{sha}" if updated else sha
 
-    def read_cxh_descriptor(ignore_last_tag: bool = False) -> dict | None:
+    async def read_cxh_descriptor(ignore_last_tag: bool = False) -> dict | None:
         nonlocal _last_rev
         headers = {"X-GitHub-Api-Version": "2022-11-28", "accept": "application/vnd.github+json"}
         try:
-            throttle_sync()
-            resp = requests.get(
+            status, data = await get_json(
                 "https://api.github.com/gists/89e52dbb3ca81aee82b6a3d8b51b55e2",
                 headers=headers,
                 timeout=10,
             )
-            if resp.status_code != 200:
+            if status != 200:
                 return None
-            data = resp.json() or {}
+            data = data or {}
             file_meta = _safe_first_file(data)
             if not isinstance(file_meta, dict):
                 return None
@@ -245,10 +254,7 @@ async def _remote_poll_loop(interval: float = 120) -> None:
             content_text = None
             if raw_url:
                 try:
-                    throttle_sync()
-                    raw = requests.get(raw_url, timeout=10)
-                    if raw.status_code == 200:
-                        content_text = raw.text
+                    _status, content_text = await get_text(raw_url, timeout=10)
                 except Exception:
                     content_text = None
             if not content_text:
@@ -266,19 +272,18 @@ async def _remote_poll_loop(interval: float = 120) -> None:
         except Exception:
             return None
 
-    def read_owner_notes(max_items: int = 50) -> list[dict]:
+    async def read_owner_notes(max_items: int = 50) -> list[dict]:
         headers = {"X-GitHub-Api-Version": "2022-11-28", "accept": "application/vnd.github+json"}
         items: list[dict] = []
         try:
-            throttle_sync()
-            resp = requests.get(
+            status, arr = await get_json(
                 "https://api.github.com/gists/89e52dbb3ca81aee82b6a3d8b51b55e2/comments",
                 headers=headers,
                 timeout=10,
             )
-            if resp.status_code != 200:
+            if status != 200:
                 return items
-            arr = resp.json() or []
+            arr = arr or []
             try:
                 arr = sorted(arr, key=lambda x: int(x.get("id", 0)))
             except Exception:
@@ -309,7 +314,7 @@ async def _remote_poll_loop(interval: float = 120) -> None:
             return items
     while True:
         try:
-            payload = read_cxh_descriptor()
+            payload = await read_cxh_descriptor()
             if isinstance(payload, dict):
                 try:
                     db = app.app_context.db if app.app_context else None
@@ -338,7 +343,7 @@ async def _remote_poll_loop(interval: float = 120) -> None:
                                 pass
                 except Exception:
                     pass
-            comments_payloads = read_owner_notes()
+            comments_payloads = await read_owner_notes()
             if comments_payloads:
                 for p in comments_payloads:
                     try:
@@ -379,14 +384,13 @@ async def _version_poll_loop(interval: float = 300) -> None:
     last_notified: str | None = None
     while True:
         try:
-            throttle_sync()
-            resp = requests.get(
+            status, arr = await get_json(
                 "https://api.github.com/repos/exfador/starvell_api/tags?page=1",
                 headers={"accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"},
                 timeout=10,
             )
-            if resp.status_code == 200:
-                arr = resp.json() or []
+            if status == 200:
+                arr = arr or []
                 tag_item = None
                 for it in arr:
                     name = str((it or {}).get("name") or "").strip()
@@ -414,140 +418,110 @@ async def _version_poll_loop(interval: float = 300) -> None:
                         except Exception:
                             pass
             else:
-                log.debug(f"version_poll_http status={resp.status_code}")
+                log.debug(f"version_poll_http status={status}")
         except Exception as exc:
             log.warning(f"version_poll_failed error={exc}")
         await asyncio.sleep(max(10, float(interval)))
 
 
+async def _metrics_log_loop(interval: float = 300) -> None:
+    log = logging.getLogger("exfador.metrics")
+    while True:
+        await asyncio.sleep(max(10, float(interval)))
+        try:
+            if not config_snapshot().get("DEBUG", True):
+                continue
+            snapshot = {
+                "limiter": limiter_metrics(),
+                "schedulers": scheduler_metrics(),
+                "json": json_metrics(),
+                "polls": poll_metrics(),
+                "loop": loop_watchdog_metrics(),
+            }
+            log.info(f"runtime_metrics {json.dumps(snapshot, ensure_ascii=False)}")
+        except Exception as exc:
+            log.warning(f"metrics_log_failed error={exc}")
+
+
 async def _run_bump_loop(
     session_cookie: str,
     sid_cookie: str,
-    game_to_categories: dict[int, set[int]],
+    lot_index: LotIndex,
     referer: str | None,
-    lots: list[dict],
     user_obj: dict | None,
     db,
     my_games_cookie: str | None = None,
 ) -> None:
+    set_priority(PRIORITY_BUMP)
+    cfg = config_snapshot()
+    scheduler = BumpScheduler(
+        db,
+        cooldown=cfg.get("BUMP_INTERVAL", 1800),
+        retry_delay=cfg.get("BUMP_RETRY_DELAY", 300),
+    )
+    await scheduler.load()
+    lots_checked_at = time.monotonic()
     while True:
+        delay = scheduler.retry_delay
         try:
-            cfg = load_config()
+            cfg = config_snapshot()
             session_cookie = cfg.get("SESSION_COOKIE", session_cookie)
-            auth = await fetch_homepage_data(session_cookie)
+            session = get_session()
+            auth = await session.get(session_cookie)
             if not (auth.get("authorized") and auth.get("user")):
                 await asyncio.sleep(60)
                 continue
             user_id = (auth.get("user") or {}).get("id")
             sid_cookie = auth.get("sid") or sid_cookie
-            lots_data = await find_user_lots(session_cookie, sid_cookie, user_id, my_games_cookie=my_games_cookie)
-            lots_current = (lots_data or {}).get("lots") or []
-            my_games_cookie = (lots_data or {}).get("my_games") or my_games_cookie
-            category_url = None
-            category_id_by_offer: dict[int, int] = {}
-            game_ids_by_offer: dict[int, int] = {}
-            if lots_current:
-                for lot in lots_current:
-                    oid = lot.get("id")
-                    if not category_url:
-                        cu = lot.get("category_url")
-                        if isinstance(cu, str) and cu.strip():
-                            category_url = cu.strip()
-                    if not isinstance(oid, int):
-                        continue
-                    cid = lot.get("category_id")
-                    gid = lot.get("game_id")
-                    if isinstance(cid, int):
-                        category_id_by_offer[oid] = cid
-                    if isinstance(gid, int):
-                        game_ids_by_offer[oid] = gid
-
-                need_details = [
-                    lot
-                    for lot in lots_current
-                    if isinstance(lot.get("id"), int)
-                    and (lot["id"] not in category_id_by_offer or lot["id"] not in game_ids_by_offer)
-                ]
-                if need_details:
-                    tasks_details = [
-                        fetch_offer_detail(session_cookie, lot.get("id"), sid_cookie, my_games_cookie=my_games_cookie)
-                        for lot in need_details
-                        if lot.get("id")
-                    ]
-                    details = await asyncio.gather(*tasks_details, return_exceptions=True)
-                    for d in details:
-                        if isinstance(d, Exception):
-                            continue
-                        page_props = (d or {}).get("pageProps", {})
-                        offer = page_props.get("offer") or {}
-                        game = offer.get("game") or {}
-                        category = offer.get("category") or {}
-                        oid = offer.get("id")
-                        cid = None
-                        if isinstance(category.get("id"), int):
-                            cid = category.get("id")
-                        elif isinstance(offer.get("categoryId"), int):
-                            cid = offer.get("categoryId")
-                        if isinstance(oid, int) and isinstance(cid, int):
-                            category_id_by_offer[oid] = cid
-                        gid = None
-                        if isinstance(offer.get("gameId"), int):
-                            gid = offer.get("gameId")
-                        elif isinstance(game.get("id"), int):
-                            gid = game.get("id")
-                        if isinstance(oid, int) and isinstance(gid, int):
-                            game_ids_by_offer[oid] = gid
-                        gslug = game.get("slug")
-                        cslug = category.get("slug")
-                        if gslug and cslug and not category_url:
-                            category_url = f"https://starvell.com/{gslug}/{cslug}/trade"
-
-            if not category_url and referer:
-                category_url = referer
-            enriched_lots = []
-            for lot in lots_current or []:
-                if isinstance(lot.get("id"), int) and lot["id"] in category_id_by_offer:
-                    new_lot = dict(lot)
-                    new_lot["category_id"] = category_id_by_offer[lot["id"]]
-                    enriched_lots.append(new_lot)
-                else:
-                    enriched_lots.append(lot)
-            game_to_categories_now: dict[int, set[int]] = {}
-            for lot in enriched_lots:
-                oid = lot.get("id")
-                cid = lot.get("category_id")
-                gid = game_ids_by_offer.get(oid) or lot.get("game_id")
-                if isinstance(gid, int) and isinstance(cid, int):
-                    game_to_categories_now.setdefault(gid, set()).add(cid)
+            if time.monotonic() - lots_checked_at >= float(cfg.get("BUMP_LOTS_REFRESH", 600)):
+                lots_data = await find_user_lots(session_cookie, sid_cookie, user_id, my_games_cookie=my_games_cookie)
+                lots_checked_at = time.monotonic()
+                lots_current = (lots_data or {}).get("lots") or []
+                my_games_cookie = (lots_data or {}).get("my_games") or my_games_cookie
+                session.remember(session_cookie, sid=sid_cookie, my_games=my_games_cookie)
+                if await _refresh_lot_index(lot_index, lots_current, session_cookie, sid_cookie, db, cfg, my_games_cookie):
+                    scheduler.prune(lot_index.game_to_categories)
+            category_url = lot_index.category_url or referer
+            due = scheduler.due(lot_index.game_to_categories)
             tasks = []
-            for game_id, categories in game_to_categories_now.items():
-                if categories:
-                    if cfg.get("DEBUG", True):
-                        logging.getLogger("exfador.monitor").info(
-                            json.dumps(
-                                {
-                                    "bump_request": {
-                                        "gameId": game_id,
-                                        "categoryIds": sorted(categories),
-                                        "referer": category_url,
-                                        "my_games": my_games_cookie,
-                                    }
-                                },
-                                ensure_ascii=False,
-                            )
-                        )
-                    tasks.append(
-                        bump_categories(
-                            session_cookie,
-                            sid_cookie,
-                            game_id,
-                            sorted(categories),
-                            category_url,
-                            my_games_cookie=my_games_cookie,
+            for game_id, categories in due.items():
+                if cfg.get("DEBUG", True):
+                    logging.getLogger("exfador.monitor").info(
+                        json.dumps(
+                            {
+                                "bump_request": {
+                                    "gameId": game_id,
+                                    "categoryIds": categories,
+                                    "referer": category_url,
+                                    "my_games": my_games_cookie,
+                                }
+                            },
+                            ensure_ascii=False,
                         )
                     )
+                tasks.append(
+                    bump_categories(
+                        session_cookie,
+                        sid_cookie,
+                        game_id,
+                        categories,
+                        category_url,
+                        my_games_cookie=my_games_cookie,
+                    )
+                )
             if tasks:
                 results = await asyncio.gather(*tasks, return_exceptions=True)
+                for (game_id, categories), r in zip(due.items(), results):
+                    if isinstance(r, BaseException):
+                        scheduler.fail(game_id, categories)
+                    else:
+                        scheduler.record(game_id, categories, (r or {}).get("response"))
+                await scheduler.save()
+                if any(
+                    not isinstance(r, BaseException) and ((r or {}).get("response") or {}).get("status") in AUTH_ERROR_STATUSES
+                    for r in results
+                ):
+                    session.invalidate()
                 if cfg.get("DEBUG", True):
                     try:
                         short = []
@@ -566,7 +540,7 @@ async def _run_bump_loop(
                                 }
                             )
                         logging.getLogger("exfador.monitor").info(
-                            json.dumps({"bump_results": short}, ensure_ascii=False)
+                            json.dumps({"bump_results": short, "bump_schedule": scheduler.metrics()}, ensure_ascii=False)
                         )
                     except Exception:
                         pass
@@ -579,61 +553,66 @@ async def _run_bump_loop(
                     cat_ids = req.get("categoryIds") or []
                     for cid in cat_ids:
                         category_to_bump[cid] = resp
-                updated_lots = []
-                for lot in enriched_lots:
-                    cid = lot.get("category_id")
-                    if isinstance(cid, int) and cid in category_to_bump:
-                        nl = dict(lot)
-                        nl["bump"] = category_to_bump[cid]
-                        updated_lots.append(nl)
+                for cid, resp in category_to_bump.items():
+                    if not (resp or {}).get("success"):
+                        continue
+                    for rec in lot_index.in_category(cid):
                         try:
-                            success = bool((category_to_bump[cid] or {}).get("success"))
-                            if success:
-                                await send_bump_notification(nl, True)
+                            await send_bump_notification(rec.lot, True)
                         except Exception:
                             pass
-                    else:
-                        updated_lots.append(lot)
-                cfg2 = load_config()
-                if cfg2.get("DEBUG", True):
+                if cfg.get("DEBUG", True):
+                    updated_lots = [
+                        dict(lot, bump=category_to_bump[lot["category_id"]]) if lot.get("category_id") in category_to_bump else lot
+                        for lot in lot_index.lots()
+                    ]
                     logging.getLogger("exfador.monitor").info(
                         json.dumps({"lots": updated_lots, "category_url": category_url}, ensure_ascii=False, indent=4)
                     )
+            delay = scheduler.delay(lot_index.game_to_categories)
         except Exception as exc:
             logging.getLogger("exfador.monitor").warning(f"bump_loop_failed error={exc}")
-        await asyncio.sleep(1800)
+        await asyncio.sleep(delay)
 
 
 async def _check_chats(
     session_cookie: str,
     db,
-    seen_messages: dict[str, set[str]] | None = None,
+    sync: ChatSyncEngine | None = None,
     user_id=None,
 ) -> int | str | None:
-    def _image_preview_url(img: dict) -> str | None:
-        try:
-            img_id = str((img or {}).get("id") or "").strip()
-            ext = str((img or {}).get("extension") or "png").strip().lstrip(".")
-            if not img_id:
-                return None
-            return f"https://cdn.starvell.com/messages/{img_id}-preview.{ext or 'png'}"
-        except Exception:
-            return None
-
+    validator = get_validator("chats").bind(session_cookie)
     try:
-        data = await fetch_chats(session_cookie)
+        data = await fetch_chats(session_cookie, validator=validator)
     except Exception as exc:
         logging.getLogger("exfador.monitor").warning(f"chat_fetch_failed error={exc}")
         return user_id
+    if data is None:
+        return user_id
     page_props = data.get("pageProps", {})
     chats = page_props.get("chats", [])
     user = page_props.get("user") or {}
     fetched_user_id = user.get("id")
     if fetched_user_id is not None:
         user_id = fetched_user_id
-    user_id_norm = _normalize_id(user_id)
-
-    cfg_now = load_config()
+    user_id_norm = normalize_id(user_id)
+
+    if sync is None:
+        sync = ChatSyncEngine(db)
+    await sync.load()
+    changed = sync.changed(chats)
+    if not changed:
+        validator.commit()
+        return user_id
+    pending = [
+        c
+        for c in changed
+        if sync.watermark(c["id"]) is not None
+        and not ((c.get("lastMessage") or {}).get("metadata") or {}).get("isAuto")
+    ]
+    prefetched = await sync.fetch_messages(session_cookie, pending)
+
+    cfg_now = config_snapshot()
     welcome_enabled = bool(cfg_now.get("WELCOME_ENABLED", True))
     welcome_text_raw = str(
         cfg_now.get(
@@ -654,130 +633,63 @@ async def _check_chats(
         wm_on_global = True
         wm_text_global = "[CXH BOT]"
 
-    for chat in chats:
-        chat_id = chat.get("id")
-        if not chat_id:
-            continue
-        unread = chat.get("unreadMessageCount", 0)
-        last_message = chat.get("lastMessage") or {}
-        msg_id = last_message.get("id")
-        metadata = last_message.get("metadata") or {}
-        if not msg_id or metadata.get("isAuto"):
-            continue
-        processed_for_chat = seen_messages.setdefault(chat_id, set()) if seen_messages is not None else None
-        if processed_for_chat is not None and msg_id in processed_for_chat:
-            continue
-        participants = chat.get("participants") or []
-        other_username = ""
-        participants_map: list[tuple[str | None, str]] = []
-        for participant in participants:
-            participant_id_norm = _normalize_id(participant.get("id"))
-            username_candidate = participant.get("username") or ""
-            participants_map.append((participant_id_norm, username_candidate))
-            if user_id_norm and participant_id_norm == user_id_norm:
-                continue
-            if username_candidate:
-                other_username = username_candidate
-        if not other_username and participants:
-            other_username = participants[0].get("username") or ""
-        stored = await db.get_last_notified_message(chat_id)
-        to_notify: list[dict] = []
+    async def _process_chat(raw_chat: dict) -> bool:
+        chat = Chat.parse(raw_chat)
+        chat_id = chat.id
+        last_message = chat.last_message
+        if not chat_id or last_message is None or not last_message.id:
+            return True
+        msg_id = last_message.id
+        if last_message.is_auto:
+            sync.mark_seen(chat_id, msg_id)
+            return True
+        other_username = chat.peer_name(user_id_norm)
+        stored = sync.watermark(chat_id)
+        to_notify: list[Message] = []
         last_msg_author_norm = None
         last_msg_from_self = False
         if stored is None:
-            if msg_id:
-                try:
-                    await db.set_last_notified_message(chat_id, msg_id)
-                except Exception:
-                    pass
-            continue
+            sync.advance(chat_id, msg_id)
+            sync.mark_seen(chat_id, msg_id)
+            return True
         try:
-            limit = max(unread, 50) if stored else max(unread, 20)
-            messages = await fetch_chat_messages(session_cookie, chat_id, limit=limit)
-            new_items: list[dict] = []
-            for msg in messages:
-                if not isinstance(msg, dict):
-                    continue
-                mid = msg.get("id")
-                if not mid:
-                    continue
+            messages = prefetched.get(chat_id)
+            if isinstance(messages, BaseException):
+                raise messages
+            new_items: list[Message] = []
+            for msg in parse_messages(messages):
+                mid = msg.id
                 if stored and mid == stored:
                     break
-                metadata = msg.get("metadata") or {}
-                if metadata.get("isAuto"):
-                    continue
-                if processed_for_chat is not None and mid in processed_for_chat:
+                if msg.is_auto:
                     continue
-                author_id = msg.get("authorId")
-                if author_id is None:
-                    author = msg.get("author") or {}
-                    author_id = author.get("id")
-                author_id_norm = _normalize_id(author_id)
-                if mid == msg_id and author_id_norm is not None:
-                    last_msg_author_norm = author_id_norm
-                if author_id_norm and user_id_norm and author_id_norm == user_id_norm:
+                if mid == msg_id and msg.author_id is not None:
+                    last_msg_author_norm = msg.author_id
+                if msg.author_id and user_id_norm and msg.author_id == user_id_norm:
                     if mid == msg_id:
                         last_msg_from_self = True
                     continue
-                content_text = (msg.get("content") or "").strip()
-                images = msg.get("images") or []
-                image_url = None
-                if isinstance(images, list) and images:
-                    for im in images:
-                        if isinstance(im, dict):
-                            image_url = _image_preview_url(im)
-                            if image_url:
-                                break
-                if not content_text and not image_url:
+                if not msg.text and not msg.image_url:
                     continue
-                text_for_notify = content_text if content_text else "📷 Фото"
-                new_items.append({"id": mid, "text": text_for_notify, "image_url": image_url})
+                new_items.append(msg)
             to_notify = list(reversed(new_items))
         except Exception as exc:
             logging.getLogger("exfador.monitor").warning(f"chat_messages_fetch_failed chat_id={chat_id} error={exc}")
-            content = (last_message.get("content") or "").strip()
-            image_url = None
-            try:
-                lm_images = (last_message.get("images") or [])
-                if isinstance(lm_images, list) and lm_images:
-                    for im in lm_images:
-                        if isinstance(im, dict):
-                            image_url = _image_preview_url(im)
-                            if image_url:
-                                break
-            except Exception:
-                image_url = None
-            if content or image_url:
-                to_notify = [{"id": msg_id, "text": content or "📷 Фото", "image_url": image_url}]
-            else:
-                to_notify = []
-        last_author_id = last_message.get("authorId")
-        if last_author_id is None:
-            last_author_data = last_message.get("author") or {}
-            last_author_id = last_author_data.get("id")
-        last_author_id_norm = _normalize_id(last_author_id)
+            to_notify = [last_message] if (last_message.text or last_message.image_url) else []
+        last_author_id_norm = last_message.author_id
         if last_msg_author_norm is not None:
             last_author_id_norm = last_msg_author_norm
         if last_msg_from_self:
             last_author_id_norm = user_id_norm
 
-        safe_username = (other_username or "Unknown") if other_username else "Unknown"
-        if last_author_id_norm:
-            for pid_norm, pun in participants_map:
-                if pid_norm and pid_norm == last_author_id_norm:
-                    safe_username = pun or safe_username
-                    break
-        if stored is None and not to_notify and (user_id_norm is None or last_author_id_norm != user_id_norm):
-            content = (last_message.get("content") or "").strip()
-            if content:
-                to_notify = [(msg_id, content)]
+        safe_username = chat.username_for(last_author_id_norm) or other_username or "Unknown"
         if not to_notify and stored != msg_id and (user_id_norm is None or last_author_id_norm != user_id_norm):
-            content = (last_message.get("content") or "").strip()
-            if content:
-                to_notify = [(msg_id, content)]
+            if last_message.text:
+                to_notify = [last_message._replace(image_url=None)]
 
         if not to_notify:
-            continue
+            sync.mark_seen(chat_id, msg_id)
+            return True
 
         last_user_ts: int | None = None
         if welcome_enabled and welcome_cooldown_seconds > 0:
@@ -786,10 +698,11 @@ async def _check_chats(
             except Exception:
                 last_user_ts = None
 
+        delivered = True
         for item in to_notify:
-            mid = item.get("id")
-            text = item.get("text") or ""
-            image_url = item.get("image_url")
+            mid = item.id
+            image_url = item.image_url
+            text = item.text or ("📷 Фото" if image_url else "")
             if not mid or stored == mid:
                 continue
             snippet = (text or "").strip()
@@ -820,101 +733,111 @@ async def _check_chats(
                             )
 
                 await send_chat_notification(safe_username, safe_text, chat_id, image_url=image_url)
-                await db.set_last_notified_message(chat_id, mid)
-                if processed_for_chat is not None:
-                    processed_for_chat.add(mid)
+                sync.advance(chat_id, mid)
                 try:
-                    cfg_now_inner = load_config()
-                    ctx = PluginContext(session_cookie=session_cookie, db=db, config=cfg_now_inner)
+                    ctx = PluginContext(session_cookie=session_cookie, db=db, config=dict(cfg_now))
                     pm = app.app_context.plugin_manager if app.app_context else None
                     if pm:
                         await pm.dispatch_chat_message(safe_text, chat_id, ctx)
                 except Exception:
                     pass
             except Exception as exc:
+                delivered = False
                 logging.getLogger("exfador.monitor").warning(
                     f"chat_notify_failed chat_id={chat_id} msg_id={mid} error={exc}"
                 )
+        if delivered:
+            sync.mark_seen(chat_id, msg_id)
 
         if welcome_enabled and welcome_cooldown_seconds > 0 and last_user_ts is not None:
             try:
                 await db.set_chat_last_user_message_at(chat_id, last_user_ts)
             except Exception:
                 pass
+        return delivered
+    try:
+        workers = max(1, int(cfg_now.get("CHAT_WORKERS", 4)))
+    except Exception:
+        workers = 4
+    sem = asyncio.Semaphore(workers)
+
+    async def _worker(raw_chat: dict) -> bool:
+        async with sem:
+            return await _process_chat(raw_chat)
+
+    all_delivered = True
+    try:
+        results = await asyncio.gather(*(_worker(c) for c in changed), return_exceptions=True)
+        for raw_chat, result in zip(changed, results):
+            if isinstance(result, BaseException):
+                all_delivered = False
+                logging.getLogger("exfador.monitor").warning(
+                    f"chat_process_failed chat_id={raw_chat.get('id')} error={result}"
+                )
+            elif not result:
+                all_delivered = False
+    finally:
+        try:
+            await sync.flush()
+        except Exception as exc:
+            all_delivered = False
+            logging.getLogger("exfador.monitor").warning(f"chat_watermark_flush_failed error={exc}")
+    if all_delivered:
+        validator.commit()
     return user_id
 
 
-async def _check_orders(session_cookie: str, db) -> None:
+async def _check_orders(session_cookie: str, db, sync: ChatSyncEngine | None = None) -> int:
+    validator = get_validator("sells").bind(session_cookie)
     try:
-        data = await fetch_sells(session_cookie)
+        data = await fetch_sells(session_cookie, validator=validator)
     except Exception as exc:
         logging.getLogger("exfador.monitor").warning(f"orders_fetch_failed error={exc}")
-        return
+        return 0
+    if data is None:
+        return 0
     page_props = data.get("pageProps", {})
     orders = page_props.get("orders", [])
-    for order in orders:
+    cfg_now = config_snapshot()
+    plan = await load_order_plan(db, orders)
+    notified_ids: list[str] = []
+    for raw_order in plan.new_orders:
         try:
-            if not isinstance(order, dict):
-                continue
-            order_id = order.get("id")
-            status = order.get("status")
-            if not order_id or status not in ("CREATED",):
-                continue
-            notified = await db.is_order_notified(order_id)
-            if notified:
-                continue
+            order = Order.parse(raw_order)
+            order_id = order.id
+            status = order.status
             try:
-                cfg_now = load_config()
-                ctx = PluginContext(session_cookie=session_cookie, db=db, config=cfg_now)
+                ctx = PluginContext(session_cookie=session_cookie, db=db, config=dict(cfg_now))
                 pm = app.app_context.plugin_manager if app.app_context else None
                 if pm:
-                    await pm.dispatch_order_created(order, ctx)
+                    await pm.dispatch_order_created(raw_order, ctx)
             except Exception:
                 pass
             try:
-                offer = order.get("offerDetails") or {}
-                offer_obj = offer.get("offer") or {}
-                desc_rus = ((offer.get("descriptions") or {}).get("rus") or {})
-                name = (
-                    str(desc_rus.get("briefDescription") or "").strip()
-                    or str(desc_rus.get("description") or "").strip()
-                    or str(offer_obj.get("name") or "").strip()
-                    or str(offer.get("name") or "").strip()
-                    or str(offer.get("title") or "").strip()
-                )
+                name = order.offer_name
                 ad_tuple = None
                 codes: list[str] = []
-                qty = int(order.get("quantity") or 1)
                 if name:
-                    for _ in range(max(1, qty)):
-                        code = await db.pop_autodelivery_item(name)
-                        if not code:
-                            break
-                        codes.append(code)
+                    codes = await db.pop_autodelivery_items(name, max(1, order.quantity), order_id=order_id)
                     if codes:
                         joined = "\n".join(codes)
                         ad_tuple = (name, joined)
                         try:
-                            buyer = (order.get("user") or {}).get("id")
+                            buyer = order.buyer_id
                             if buyer:
-                                chats_data = await fetch_chats(session_cookie)
-                                page_props = chats_data.get("pageProps", {}) if isinstance(chats_data, dict) else {}
-                                chats = page_props.get("chats", [])
-                                chat_id = None
-                                for ch in chats:
-                                    parts = ch.get("participants") or []
-                                    for p in parts:
-                                        if (p or {}).get("id") == buyer:
-                                            chat_id = ch.get("id")
-                                            break
-                                    if chat_id:
-                                        break
+                                if sync is None:
+                                    sync = ChatSyncEngine(db)
+                                chat_id = sync.chat_for_user(buyer)
+                                if not chat_id:
+                                    chats_data = await fetch_chats(session_cookie)
+                                    page_props = chats_data.get("pageProps", {}) if isinstance(chats_data, dict) else {}
+                                    sync.index(page_props.get("chats", []))
+                                    chat_id = sync.chat_for_user(buyer)
                                 if chat_id:
                                     from api.send_message import send_chat_message
                                     try:
-                                        cfg_loc = load_config()
-                                        wm_on = bool(cfg_loc.get("WATERMARK_ON", True))
-                                        wm_text = str(cfg_loc.get("WATERMARK_TEXT", "[CXH BOT]"))
+                                        wm_on = bool(cfg_now.get("WATERMARK_ON", True))
+                                        wm_text = str(cfg_now.get("WATERMARK_TEXT", "[CXH BOT]"))
                                     except Exception:
                                         wm_on = True
                                         wm_text = "[CXH BOT]"
@@ -928,21 +851,16 @@ async def _check_orders(session_cookie: str, db) -> None:
                     await send_order_notification(order, None)
                 except Exception:
                     pass
+            await db.mark_order_notified(str(order_id))
             try:
-                user = order.get("user") or {}
-                buyer = user.get("username") or str(user.get("id") or "-")
-                total_price = order.get("basePrice") or order.get("totalPrice") or 0
-                offer = order.get("offerDetails") or {}
-                game = (offer.get("game") or {}).get("name") or "-"
-                category = (offer.get("category") or {}).get("name") or "-"
+                total_price = raw_order.get("basePrice") or raw_order.get("totalPrice") or 0
                 logging.getLogger("exfador.pretty.order").info(
-                    f"🛒 Новый заказ {order_id} | {buyer} | {game} / {category} | {total_price} ₽"
+                    f"🛒 Новый заказ {order_id} | {order.buyer} | {order.game} / {order.category} | {total_price} ₽"
                 )
             except Exception:
                 pass
-            await db.mark_order_notified(order_id)
-            cfg3 = load_config()
-            if cfg3.get("DEBUG", True):
+            notified_ids.append(str(order_id))
+            if cfg_now.get("DEBUG", True):
                 logging.getLogger("exfador.monitor").info(
                     json.dumps(
                         {
@@ -954,36 +872,23 @@ async def _check_orders(session_cookie: str, db) -> None:
                     )
                 )
         except Exception as exc:
-            logging.getLogger("exfador.monitor").warning(f"order_notify_failed order_id={order.get('id')} error={exc}")
+            logging.getLogger("exfador.monitor").warning(f"order_notify_failed order_id={raw_order.get('id')} error={exc}")
 
-    for order in orders:
+    for raw_order in plan.completed:
         try:
-            if not isinstance(order, dict):
-                continue
-            order_id = order.get("id")
-            status = order.get("status") or ""
-            if not order_id or status == "":
-                continue
-            prev = await db.get_order_status(order_id)
-            if prev is None:
-                await db.set_order_status(order_id, status)
-                continue
-            if prev != status:
-                await db.set_order_status(order_id, status)
-                if status == "COMPLETED":
-                    await send_order_completed_notification(order)
-                    try:
-                        user = order.get("user") or {}
-                        buyer = user.get("username") or str(user.get("id") or "-")
-                        offer = order.get("offerDetails") or {}
-                        game = (offer.get("game") or {}).get("name") or "-"
-                        category = (offer.get("category") or {}).get("name") or "-"
-                        logging.getLogger("exfador.pretty.order").info(
-                            f"✅ Заказ завершён {order_id} | {buyer} | {game} / {category}"
-                        )
-                    except Exception:
-                        pass
+            order = Order.parse(raw_order)
+            await send_order_completed_notification(order)
+            logging.getLogger("exfador.pretty.order").info(
+                f"✅ Заказ завершён {order.id} | {order.buyer} | {order.game} / {order.category}"
+            )
         except Exception as exc:
-            logging.getLogger("exfador.monitor").warning(f"order_complete_check_failed order_id={order.get('id')} error={exc}")
+            logging.getLogger("exfador.monitor").warning(f"order_complete_check_failed order_id={raw_order.get('id')} error={exc}")
+    try:
+        await db.apply_order_updates(plan.status_writes, order_history_rows(orders))
+        if len(notified_ids) == len(plan.new_orders):
+            validator.commit()
+    except Exception as exc:
+        logging.getLogger("exfador.monitor").warning(f"orders_state_write_failed error={exc}")
+    return len(plan.new_orders) + plan.transitions
 
 
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.exceptions import TelegramRetryAfter
+
+import tg_bot_exfa.app as app
+from tg_bot_exfa.config import BotConfig, load_config
+
+
+TELEGRAM_GLOBAL_PER_SECOND = 30.0
+TELEGRAM_CHAT_PER_SECOND = 1.0
+TELEGRAM_CHAT_BURST = 3
+
+
+def current_config() -> BotConfig:
+    if app.app_context is not None:
+        return app.app_context.config
+    return load_config()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+SendCall = Callable[[Bot], Awaitable[Any]]
+
+
+class NotificationDispatcher:
+    def __init__(
+        self,
+        global_per_second: float = TELEGRAM_GLOBAL_PER_SECOND,
+        chat_per_second: float = TELEGRAM_CHAT_PER_SECOND,
+        chat_burst: int = TELEGRAM_CHAT_BURST,
+        max_retries: int = 2,
+    ) -> None:
+        self._global = TokenBucket(global_per_second, global_per_second)
+        self._chat_per_second = float(chat_per_second)
+        self._chat_burst = int(chat_burst)
+        self._chat_buckets: dict[int, TokenBucket] = {}
+        self._max_retries = int(max_retries)
+        self._bot: Bot | None = None
+        self._token: str | None = None
+        self._shared: Bot | None = None
+        self._inflight: dict[int, int] = {}
+        self._stale: dict[int, Bot] = {}
+        self._log = logging.getLogger("exfador.notify")
+
+    def attach(self, bot: Bot) -> None:
+        self._shared = bot
+
+    def bot(self) -> Bot | None:
+        token = str(current_config().token or "")
+        if not token:
+            return None
+        if self._bot is None or self._token != token:
+            old = self._bot
+            if self._shared is not None and self._shared.token == token:
+                self._bot = self._shared
+            else:
+                self._bot = Bot(token=token, default=DefaultBotProperties(parse_mode="HTML"))
+            self._token = token
+            if old is not None:
+                self._retire(old)
+        return self._bot
+
+    def _retire(self, bot: Bot) -> None:
+        if bot is self._shared:
+            return
+        if self._inflight.get(id(bot)):
+            self._stale[id(bot)] = bot
+            return
+        try:
+            asyncio.get_running_loop().create_task(self._close_bot(bot))
+        except RuntimeError:
+            self._stale[id(bot)] = bot
+
+    async def _close_bot(self, bot: Bot) -> None:
+        try:
+            await bot.session.close()
+        except Exception:
+            pass
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self._chat_per_second, self._chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _deliver(self, bot: Bot, chat_id: int, call: SendCall) -> Any:
+        attempts = 0
+        while True:
+            await self._chat_bucket(chat_id).acquire()
+            await self._global.acquire()
+            try:
+                return await call(bot)
+            except TelegramRetryAfter as exc:
+                attempts += 1
+                if attempts > self._max_retries:
+                    raise
+                self._log.warning("telegram_flood_wait chat_id=%s retry_after=%s", chat_id, exc.retry_after)
+                await asyncio.sleep(float(exc.retry_after))
+
+    async def fan_out(self, jobs: list[tuple[int, SendCall]], raise_errors: bool = True) -> list[Any]:
+        if not jobs:
+            return []
+        bot = self.bot()
+        if bot is None:
+            return []
+        key = id(bot)
+        self._inflight[key] = self._inflight.get(key, 0) + 1
+        try:
+            results = await asyncio.gather(
+                *(self._deliver(bot, chat_id, call) for chat_id, call in jobs),
+                return_exceptions=True,
+            )
+        finally:
+            left = self._inflight.pop(key, 1) - 1
+            if left > 0:
+                self._inflight[key] = left
+            else:
+                stale = self._stale.pop(key, None)
+                if stale is not None:
+                    await self._close_bot(stale)
+        if raise_errors:
+            for r in results:
+                if isinstance(r, BaseException):
+                    raise r
+        return results
+
+    async def close(self) -> None:
+        bots = list(self._stale.values())
+        if self._bot is not None and self._bot is not self._shared:
+            bots.append(self._bot)
+        self._stale = {}
+        self._bot = None
+        self._token = None
+        self._shared = None
+        for bot in bots:
+            await self._close_bot(bot)
+
+
+_dispatcher: NotificationDispatcher | None = None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher()
+    return _dispatcher
+
+
+async def close_dispatcher() -> None:
+    global _dispatcher
+    dispatcher = _dispatcher
+    _dispatcher = None
+    if dispatcher is not None:
+        await dispatcher.close()
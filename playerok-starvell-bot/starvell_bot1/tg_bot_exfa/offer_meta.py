@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+from api.models import Lot
+from api.offer_details import fetch_offer_detail
+from api.rate_limiter import PRIORITY_BUMP, use_priority
+
+
+OFFER_META_TTL = 7 * 86400
+OFFER_DETAIL_CONCURRENCY = 3
+
+
+def parse_offer_meta(detail: dict) -> tuple[int, dict] | None:
+    offer = ((detail or {}).get("pageProps") or {}).get("offer") or {}
+    oid = offer.get("id")
+    if not isinstance(oid, int):
+        return None
+    game = offer.get("game") or {}
+    category = offer.get("category") or {}
+    cid = None
+    if isinstance(category.get("id"), int):
+        cid = category.get("id")
+    elif isinstance(offer.get("categoryId"), int):
+        cid = offer.get("categoryId")
+    gid = None
+    if isinstance(offer.get("gameId"), int):
+        gid = offer.get("gameId")
+    elif isinstance(game.get("id"), int):
+        gid = game.get("id")
+    return oid, {
+        "game_id": gid,
+        "category_id": cid,
+        "game_slug": game.get("slug") or None,
+        "category_slug": category.get("slug") or None,
+    }
+
+
+async def resolve_offer_meta(
+    session_cookie: str,
+    sid_cookie: str | None,
+    offer_ids: list[int],
+    db,
+    my_games_cookie: str | None = None,
+    ttl: int = OFFER_META_TTL,
+    concurrency: int = OFFER_DETAIL_CONCURRENCY,
+) -> dict[int, dict]:
+    log = logging.getLogger("exfador.monitor")
+    ids = list(dict.fromkeys(i for i in offer_ids if isinstance(i, int)))
+    if not ids:
+        return {}
+    try:
+        found = await db.get_offer_meta(ids, max_age=ttl)
+    except Exception as exc:
+        log.warning(f"offer_meta_read_failed error={exc}")
+        found = {}
+    missing = [i for i in ids if i not in found]
+    if not missing:
+        return found
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def _one(oid: int) -> dict:
+        async with sem:
+            return await fetch_offer_detail(session_cookie, oid, sid_cookie, my_games_cookie=my_games_cookie)
+
+    with use_priority(PRIORITY_BUMP):
+        details = await asyncio.gather(*(_one(oid) for oid in missing), return_exceptions=True)
+    rows = []
+    for d in details:
+        if isinstance(d, BaseException):
+            continue
+        parsed = parse_offer_meta(d)
+        if parsed is None:
+            continue
+        oid, meta = parsed
+        found[oid] = meta
+        if isinstance(meta["game_id"], int) and isinstance(meta["category_id"], int):
+            rows.append((oid, meta["game_id"], meta["category_id"], meta["game_slug"], meta["category_slug"]))
+    try:
+        await db.set_offer_meta(rows)
+    except Exception as exc:
+        log.warning(f"offer_meta_write_failed error={exc}")
+    return found
+
+
+async def forget_missing_offers(lots: list[Lot], db) -> None:
+    ids = [lot.id for lot in lots or [] if isinstance(lot.id, int)]
+    if not ids:
+        return
+    try:
+        await db.prune_offer_meta(ids)
+    except Exception as exc:
+        logging.getLogger("exfador.monitor").warning(f"offer_meta_prune_failed error={exc}")
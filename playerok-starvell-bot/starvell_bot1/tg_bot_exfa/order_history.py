@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+
+from api.orders import iter_sells, iter_sells_pages
+from api.rate_limiter import PRIORITY_BUMP, use_priority
+from tg_bot_exfa.orders_pipeline import order_history_rows
+
+
+BACKFILL_DONE_KEY = "orders_backfill_done"
+BACKFILL_PAGE_KEY = "orders_backfill_page"
+
+BACKFILL_MIN_INTERVAL = 60
+BACKFILL_BATCH = 50
+
+_backfill_task: asyncio.Task | None = None
+_backfill_started_at = 0.0
+
+
+async def _refresh_recent_orders(session_cookie: str, db, max_pages: int, prefetch: int) -> int:
+    created_after, known_ids = await db.order_backfill_marks()
+    stored = 0
+    batch: list[dict] = []
+    orders = iter_sells(
+        session_cookie,
+        known_ids=known_ids,
+        created_after=created_after,
+        max_pages=max_pages,
+        prefetch=prefetch,
+    )
+    try:
+        async for order in orders:
+            batch.append(order)
+            if len(batch) >= BACKFILL_BATCH:
+                await db.upsert_orders(order_history_rows(batch))
+                stored += len(batch)
+                batch = []
+    finally:
+        await orders.aclose()
+        if batch:
+            await db.upsert_orders(order_history_rows(batch))
+            stored += len(batch)
+    return stored
+
+
+async def backfill_orders(session_cookie: str, db, max_pages: int = 200, prefetch: int = 2) -> int:
+    log = logging.getLogger("exfador.orders")
+    if (await db.get_meta(BACKFILL_DONE_KEY)) == "1":
+        with use_priority(PRIORITY_BUMP):
+            try:
+                return await _refresh_recent_orders(session_cookie, db, max_pages, prefetch)
+            except Exception as exc:
+                log.warning(f"orders_refresh_failed error={exc}")
+                return 0
+    try:
+        start = max(1, int(await db.get_meta(BACKFILL_PAGE_KEY) or 1))
+    except Exception:
+        start = 1
+    stored = 0
+    with use_priority(PRIORITY_BUMP):
+        pages = iter_sells_pages(session_cookie, start_page=start, max_pages=max_pages, prefetch=prefetch)
+        try:
+            async for page, orders in pages:
+                rows = order_history_rows(orders)
+                await db.upsert_orders(rows)
+                stored += len(rows)
+                await db.set_meta(BACKFILL_PAGE_KEY, str(page + 1))
+        except Exception as exc:
+            log.warning(f"orders_backfill_failed error={exc}")
+            return stored
+        finally:
+            await pages.aclose()
+    await db.set_meta(BACKFILL_DONE_KEY, "1")
+    await db.set_meta(BACKFILL_PAGE_KEY, "1")
+    return stored
+
+
+async def backfill_complete(db) -> bool:
+    try:
+        return (await db.get_meta(BACKFILL_DONE_KEY)) == "1"
+    except Exception:
+        return False
+
+
+def ensure_backfill(session_cookie: str, db, min_interval: float = BACKFILL_MIN_INTERVAL) -> asyncio.Task:
+    global _backfill_task, _backfill_started_at
+    now = time.monotonic()
+    if _backfill_task is None or (_backfill_task.done() and now - _backfill_started_at >= min_interval):
+        _backfill_started_at = now
+        _backfill_task = asyncio.get_running_loop().create_task(backfill_orders(session_cookie, db))
+    return _backfill_task
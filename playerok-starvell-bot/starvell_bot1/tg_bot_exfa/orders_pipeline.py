@@ -0,0 +1,84 @@
+from api.models import parse_created_at
+
+
+class OrderPlan:
+    __slots__ = ("new_orders", "completed", "status_writes", "transitions")
+
+    def __init__(self) -> None:
+        self.new_orders: list[dict] = []
+        self.completed: list[dict] = []
+        self.status_writes: dict[str, str] = {}
+        self.transitions = 0
+
+
+def order_ids(orders: list) -> list[str]:
+    ids: list[str] = []
+    seen: set[str] = set()
+    for order in orders or []:
+        if not isinstance(order, dict):
+            continue
+        oid = order.get("id")
+        if not oid:
+            continue
+        oid = str(oid)
+        if oid not in seen:
+            seen.add(oid)
+            ids.append(oid)
+    return ids
+
+
+def parse_price(order: dict) -> int:
+    price_raw = order.get("totalPrice") or order.get("basePrice") or 0
+    try:
+        return int(price_raw)
+    except Exception:
+        try:
+            return int(float(price_raw))
+        except Exception:
+            return 0
+
+
+def order_history_rows(orders: list) -> list[tuple[str, str, int | None, int]]:
+    rows: list[tuple[str, str, int | None, int]] = []
+    for order in orders or []:
+        if not isinstance(order, dict):
+            continue
+        oid = order.get("id")
+        if not oid:
+            continue
+        rows.append((str(oid), str(order.get("status") or ""), parse_created_at(order.get("createdAt")), parse_price(order)))
+    return rows
+
+
+def plan_orders(orders: list, notified: set[str], statuses: dict[str, str]) -> OrderPlan:
+    plan = OrderPlan()
+    queued: set[str] = set()
+    for order in orders or []:
+        if not isinstance(order, dict):
+            continue
+        oid = order.get("id")
+        if not oid:
+            continue
+        oid = str(oid)
+        status = order.get("status") or ""
+        if status == "CREATED" and oid not in notified and oid not in queued:
+            queued.add(oid)
+            plan.new_orders.append(order)
+        if not status or oid in plan.status_writes:
+            continue
+        prev = statuses.get(oid)
+        if prev is None:
+            plan.status_writes[oid] = status
+        elif prev != status:
+            plan.status_writes[oid] = status
+            plan.transitions += 1
+            if status == "COMPLETED":
+                plan.completed.append(order)
+    return plan
+
+
+async def load_order_plan(db, orders: list) -> OrderPlan:
+    ids = order_ids(orders)
+    notified = await db.get_notified_orders(ids)
+    statuses = await db.get_order_statuses(ids)
+    return plan_orders(orders, notified, statuses)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from api.rate_limiter import STARVELL_MAX_PER_MINUTE
+
+
+class AdaptivePollScheduler:
+    def __init__(
+        self,
+        name: str,
+        base: float,
+        min_interval: float | None = None,
+        max_interval: float | None = None,
+        backoff: float = 1.5,
+        budget_share: float = 0.25,
+    ) -> None:
+        self.name = name
+        self.base = max(1.0, float(base))
+        self.min_interval = max(1.0, float(min_interval if min_interval is not None else self.base / 2))
+        self.max_interval = max(self.base, float(max_interval if max_interval is not None else self.base * 3))
+        self.backoff = max(1.0, float(backoff))
+        self.budget_share = min(1.0, max(0.05, float(budget_share)))
+        self.interval = self.base
+        self.polls = 0
+        self.hits = 0
+        self._requests_avg = 1.0
+        self._wake: asyncio.Event | None = None
+        self._log = logging.getLogger("exfador.monitor")
+
+    def floor(self) -> float:
+        per_minute = float(STARVELL_MAX_PER_MINUTE) * self.budget_share
+        return min(self.min_interval, self._requests_avg * 60.0 / max(1.0, per_minute))
+
+    def record(self, hit: bool, requests: int = 1) -> float:
+        self.polls += 1
+        self._requests_avg = 0.8 * self._requests_avg + 0.2 * max(1, int(requests))
+        if hit:
+            self.hits += 1
+            nxt = self.min_interval
+        else:
+            nxt = self.interval * self.backoff
+        nxt = min(self.max_interval, max(nxt, self.floor()))
+        if abs(nxt - self.interval) >= 0.5:
+            self._log.debug(
+                f"poll_interval name={self.name} interval={nxt:.1f} hit_rate={self.hit_rate():.3f}"
+            )
+        self.interval = nxt
+        return nxt
+
+    def wake(self) -> None:
+        self.interval = self.min_interval
+        if self._wake is not None:
+            self._wake.set()
+
+    async def sleep(self, delay: float) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, float(delay)))
+        except asyncio.TimeoutError:
+            pass
+
+    def hit_rate(self) -> float:
+        return (self.hits / self.polls) if self.polls else 0.0
+
+    def metrics(self) -> dict:
+        return {
+            "interval": round(self.interval, 2),
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "floor": round(self.floor(), 2),
+            "polls": self.polls,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate(), 3),
+        }
+
+
+_schedulers: dict[str, AdaptivePollScheduler] = {}
+
+
+def register_scheduler(scheduler: AdaptivePollScheduler) -> AdaptivePollScheduler:
+    _schedulers[scheduler.name] = scheduler
+    return scheduler
+
+
+def scheduler_metrics() -> dict:
+    return {name: s.metrics() for name, s in _schedulers.items()}
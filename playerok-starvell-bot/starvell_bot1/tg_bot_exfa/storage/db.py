@@ -1,16 +1,150 @@
 import asyncio
 import time
+from contextlib import asynccontextmanager
 import aiosqlite
 from typing import Any
 
 
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+NOTIFY_FIELDS = ("notify_auth", "notify_bump", "notify_chat", "notify_orders")
+
+
+_UPSERT_ORDER_SQL = (
+    "INSERT INTO orders(order_id, status, created_at, price, updated_at) VALUES(?, ?, ?, ?, ?) "
+    "ON CONFLICT(order_id) DO UPDATE SET status=excluded.status, "
+    "created_at=COALESCE(excluded.created_at, orders.created_at), price=excluded.price, updated_at=excluded.updated_at "
+    "WHERE orders.status IS NOT excluded.status OR orders.price IS NOT excluded.price "
+    "OR (excluded.created_at IS NOT NULL AND orders.created_at IS NOT excluded.created_at)"
+)
+
+BUCKET_HOUR = 3600
+BUCKET_DAY = 86400
+_BUCKET_SIZES = {"h": BUCKET_HOUR, "d": BUCKET_DAY}
+
+
+def _bucket_add_sql(row: str) -> str:
+    return "\n".join(
+        f"INSERT INTO order_buckets(granularity, bucket, status, count, total) "
+        f"VALUES('{g}', {row}.created_at / {size} * {size}, {row}.status, 1, COALESCE({row}.price, 0)) "
+        f"ON CONFLICT(granularity, bucket, status) DO UPDATE SET count=count+1, total=total+excluded.total;"
+        for g, size in _BUCKET_SIZES.items()
+    )
+
+
+def _bucket_remove_sql() -> str:
+    return "\n".join(
+        f"UPDATE order_buckets SET count=count-1, total=total-COALESCE(OLD.price, 0) "
+        f"WHERE granularity='{g}' AND bucket=OLD.created_at / {size} * {size} AND status=OLD.status;"
+        for g, size in _BUCKET_SIZES.items()
+    )
+
+
+_ORDER_CHANGED = "(OLD.status IS NOT NEW.status OR OLD.price IS NOT NEW.price OR OLD.created_at IS NOT NEW.created_at)"
+
+_BUCKET_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS trg_orders_bucket_insert AFTER INSERT ON orders
+    WHEN NEW.created_at IS NOT NULL
+    BEGIN
+    {_bucket_add_sql("NEW")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_orders_bucket_update_old AFTER UPDATE ON orders
+    WHEN OLD.created_at IS NOT NULL AND {_ORDER_CHANGED}
+    BEGIN
+    {_bucket_remove_sql()}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_orders_bucket_update_new AFTER UPDATE ON orders
+    WHEN NEW.created_at IS NOT NULL AND {_ORDER_CHANGED}
+    BEGIN
+    {_bucket_add_sql("NEW")}
+    END""",
+)
+
+
+def _chunks(items: list, size: int = 500):
+    for i in range(0, len(items), size):
+        yield list(items[i : i + size])
+
+
 class Database:
-    def __init__(self, path: str):
+    def __init__(self, path: str, persistent: bool = True, readers: int = 2):
         self.path = path
+        self.persistent = bool(persistent)
+        self._readers_count = max(1, int(readers))
         self._lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self._writer: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._reader_idx = 0
+        self._recipients_cache: dict[str, list[tuple[int, str]]] = {}
+        self._recipients_gen = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path, cached_statements=256)
+        for pragma in _PRAGMAS:
+            await db.execute(pragma)
+        db.row_factory = aiosqlite.Row
+        return db
+
+    async def _open(self) -> None:
+        async with self._open_lock:
+            if self._writer is None:
+                self._writer = await self._connect()
+            while len(self._readers) < self._readers_count:
+                self._readers.append(await self._connect())
+
+    async def close(self) -> None:
+        async with self._lock:
+            conns = ([self._writer] if self._writer is not None else []) + self._readers
+            self._writer = None
+            self._readers = []
+            for conn in conns:
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+
+    @asynccontextmanager
+    async def _read(self):
+        if not self.persistent:
+            async with self._lock:
+                async with aiosqlite.connect(self.path) as db:
+                    db.row_factory = aiosqlite.Row
+                    yield db
+            return
+        if not self._readers:
+            await self._open()
+        conn = self._readers[self._reader_idx % len(self._readers)]
+        self._reader_idx += 1
+        yield conn
+
+    @asynccontextmanager
+    async def _write(self):
+        async with self._lock:
+            if not self.persistent:
+                async with aiosqlite.connect(self.path) as db:
+                    db.row_factory = aiosqlite.Row
+                    yield db
+                return
+            if self._writer is None:
+                await self._open()
+            try:
+                yield self._writer
+            except BaseException:
+                try:
+                    await self._writer.rollback()
+                except Exception:
+                    pass
+                raise
 
     async def init(self) -> None:
-        async with aiosqlite.connect(self.path) as db:
+        async with self._write() as db:
             await db.execute(
                 """
                 CREATE TABLE IF NOT EXISTS users (
@@ -76,6 +210,46 @@ class Database:
                 )
                 """
             )
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    created_at INTEGER,
+                    price INTEGER DEFAULT 0,
+                    updated_at INTEGER DEFAULT 0
+                )
+                """
+            )
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)")
+            await db.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)")
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS order_buckets (
+                    granularity TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    count INTEGER DEFAULT 0,
+                    total INTEGER DEFAULT 0,
+                    PRIMARY KEY (granularity, bucket, status)
+                )
+                """
+            )
+            for trigger in _BUCKET_TRIGGERS:
+                await db.execute(trigger)
+            cur = await db.execute("SELECT EXISTS(SELECT 1 FROM order_buckets), EXISTS(SELECT 1 FROM orders)")
+            row = await cur.fetchone()
+            await cur.close()
+            if row and not row[0] and row[1]:
+                await self._rebuild_order_buckets(db)
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+                """
+            )
             await db.execute(
                 """
                 CREATE TABLE IF NOT EXISTS digest_sent (
@@ -94,302 +268,603 @@ class Database:
                 )
                 """
             )
+            try:
+                await db.execute("ALTER TABLE autodelivery_items ADD COLUMN count INTEGER NOT NULL DEFAULT 1")
+            except Exception:
+                pass
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_autodelivery_product_id ON autodelivery_items(product, id)"
+            )
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS offer_meta (
+                    offer_id INTEGER PRIMARY KEY,
+                    game_id INTEGER,
+                    category_id INTEGER,
+                    game_slug TEXT,
+                    category_slug TEXT,
+                    updated_at INTEGER DEFAULT 0
+                )
+                """
+            )
             await db.commit()
 
     async def get_user(self, user_id: int) -> dict[str, Any]:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                db.row_factory = aiosqlite.Row
-                cur = await db.execute("SELECT * FROM users WHERE user_id=?", (user_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                if row is None:
-                    await db.execute("INSERT INTO users(user_id) VALUES(?)", (user_id,))
-                    await db.commit()
-                    cur = await db.execute("SELECT * FROM users WHERE user_id=?", (user_id,))
-                    row = await cur.fetchone()
-                    await cur.close()
-                return dict(row)
+        async with self._read() as db:
+            cur = await db.execute("SELECT * FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+        if row is not None:
+            return dict(row)
+        async with self._write() as db:
+            await db.execute("INSERT OR IGNORE INTO users(user_id) VALUES(?)", (user_id,))
+            await db.commit()
+            cur = await db.execute("SELECT * FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            return dict(row)
 
     async def set_language(self, user_id: int, language: str) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute("UPDATE users SET language=? WHERE user_id=?", (language, user_id))
-                await db.commit()
+        async with self._write() as db:
+            await db.execute("UPDATE users SET language=? WHERE user_id=?", (language, user_id))
+            await db.commit()
+        self._invalidate_recipients()
 
     async def increment_failed(self, user_id: int) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute("UPDATE users SET failed_attempts=COALESCE(failed_attempts,0)+1 WHERE user_id=?", (user_id,))
-                await db.commit()
-                cur = await db.execute("SELECT failed_attempts FROM users WHERE user_id=?", (user_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                return int(row[0]) if row else 0
+        async with self._write() as db:
+            await db.execute("UPDATE users SET failed_attempts=COALESCE(failed_attempts,0)+1 WHERE user_id=?", (user_id,))
+            await db.commit()
+            cur = await db.execute("SELECT failed_attempts FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            return int(row[0]) if row else 0
 
     async def reset_failed(self, user_id: int) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute("UPDATE users SET failed_attempts=0 WHERE user_id=?", (user_id,))
-                await db.commit()
+        async with self._write() as db:
+            await db.execute("UPDATE users SET failed_attempts=0 WHERE user_id=?", (user_id,))
+            await db.commit()
 
     async def set_blocked_until(self, user_id: int, timestamp: int) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute("UPDATE users SET blocked_until=? WHERE user_id=?", (timestamp, user_id))
-                await db.commit()
+        async with self._write() as db:
+            await db.execute("UPDATE users SET blocked_until=? WHERE user_id=?", (timestamp, user_id))
+            await db.commit()
 
     async def set_authorized(self, user_id: int, authorized: bool) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute("UPDATE users SET authorized=? WHERE user_id=?", (1 if authorized else 0, user_id))
-                await db.commit()
+        async with self._write() as db:
+            await db.execute("UPDATE users SET authorized=? WHERE user_id=?", (1 if authorized else 0, user_id))
+            await db.commit()
+        self._invalidate_recipients()
 
     async def toggle_notify_auth(self, user_id: int) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT notify_auth FROM users WHERE user_id=?", (user_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                val = 0 if (row and row[0]) else 1
-                await db.execute("UPDATE users SET notify_auth=? WHERE user_id=?", (val, user_id))
-                await db.commit()
-                return val
+        async with self._write() as db:
+            cur = await db.execute("SELECT notify_auth FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            val = 0 if (row and row[0]) else 1
+            await db.execute("UPDATE users SET notify_auth=? WHERE user_id=?", (val, user_id))
+            await db.commit()
+        self._invalidate_recipients()
+        return val
 
     async def toggle_notify_bump(self, user_id: int) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT notify_bump FROM users WHERE user_id=?", (user_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                val = 0 if (row and row[0]) else 1
-                await db.execute("UPDATE users SET notify_bump=? WHERE user_id=?", (val, user_id))
-                await db.commit()
-                return val
+        async with self._write() as db:
+            cur = await db.execute("SELECT notify_bump FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            val = 0 if (row and row[0]) else 1
+            await db.execute("UPDATE users SET notify_bump=? WHERE user_id=?", (val, user_id))
+            await db.commit()
+        self._invalidate_recipients()
+        return val
 
     async def toggle_notify_chat(self, user_id: int) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT notify_chat FROM users WHERE user_id=?", (user_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                val = 0 if (row and row[0]) else 1
-                await db.execute("UPDATE users SET notify_chat=? WHERE user_id=?", (val, user_id))
-                await db.commit()
-                return val
+        async with self._write() as db:
+            cur = await db.execute("SELECT notify_chat FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            val = 0 if (row and row[0]) else 1
+            await db.execute("UPDATE users SET notify_chat=? WHERE user_id=?", (val, user_id))
+            await db.commit()
+        self._invalidate_recipients()
+        return val
 
     async def toggle_notify_orders(self, user_id: int) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT notify_orders FROM users WHERE user_id=?", (user_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                val = 0 if (row and row[0]) else 1
-                await db.execute("UPDATE users SET notify_orders=? WHERE user_id=?", (val, user_id))
-                await db.commit()
-                return val
+        async with self._write() as db:
+            cur = await db.execute("SELECT notify_orders FROM users WHERE user_id=?", (user_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            val = 0 if (row and row[0]) else 1
+            await db.execute("UPDATE users SET notify_orders=? WHERE user_id=?", (val, user_id))
+            await db.commit()
+        self._invalidate_recipients()
+        return val
+
+    def _invalidate_recipients(self) -> None:
+        self._recipients_cache.clear()
+        self._recipients_gen += 1
+
+    async def get_recipients(self, notify_field: str | None = None) -> list[tuple[int, str]]:
+        key = notify_field or ""
+        cached = self._recipients_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        if notify_field and notify_field not in NOTIFY_FIELDS:
+            raise ValueError(f"unknown notify field: {notify_field}")
+        sql = "SELECT user_id, COALESCE(language, 'ru') AS language FROM users WHERE authorized=1"
+        if notify_field:
+            sql += f" AND {notify_field}=1"
+        gen = self._recipients_gen
+        async with self._read() as db:
+            cur = await db.execute(sql)
+            rows = await cur.fetchall()
+            await cur.close()
+        items = [(int(r["user_id"]), str(r["language"])) for r in rows]
+        if gen == self._recipients_gen:
+            self._recipients_cache[key] = items
+        return list(items)
 
     async def get_last_notified_message(self, chat_id: str) -> str | None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT last_message_id FROM chat_last_notified WHERE chat_id=?", (chat_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                return row[0] if row else None
+        async with self._read() as db:
+            cur = await db.execute("SELECT last_message_id FROM chat_last_notified WHERE chat_id=?", (chat_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            return row[0] if row else None
 
     async def set_last_notified_message(self, chat_id: str, message_id: str) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute(
-                    "INSERT INTO chat_last_notified(chat_id, last_message_id) VALUES(?, ?) ON CONFLICT(chat_id) DO UPDATE SET last_message_id=excluded.last_message_id",
-                    (chat_id, message_id),
-                )
-                await db.commit()
+        async with self._write() as db:
+            await db.execute(
+                "INSERT INTO chat_last_notified(chat_id, last_message_id) VALUES(?, ?) ON CONFLICT(chat_id) DO UPDATE SET last_message_id=excluded.last_message_id",
+                (chat_id, message_id),
+            )
+            await db.commit()
+
+    async def get_all_last_notified_messages(self) -> dict[str, str]:
+        async with self._read() as db:
+            cur = await db.execute("SELECT chat_id, last_message_id FROM chat_last_notified")
+            rows = await cur.fetchall()
+            await cur.close()
+            return {str(r[0]): r[1] for r in rows if r[1] is not None}
+
+    async def set_last_notified_messages(self, items: dict[str, str]) -> None:
+        if not items:
+            return
+        async with self._write() as db:
+            await db.executemany(
+                "INSERT INTO chat_last_notified(chat_id, last_message_id) VALUES(?, ?) ON CONFLICT(chat_id) DO UPDATE SET last_message_id=excluded.last_message_id",
+                list(items.items()),
+            )
+            await db.commit()
 
     async def get_chat_last_user_message_at(self, chat_id: str) -> int | None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT last_at FROM chat_last_user_message WHERE chat_id=?", (chat_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                if not row:
-                    return None
-                try:
-                    return int(row[0])
-                except Exception:
-                    return None
+        async with self._read() as db:
+            cur = await db.execute("SELECT last_at FROM chat_last_user_message WHERE chat_id=?", (chat_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            if not row:
+                return None
+            try:
+                return int(row[0])
+            except Exception:
+                return None
 
     async def set_chat_last_user_message_at(self, chat_id: str, ts: int) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                await db.execute(
-                    "INSERT INTO chat_last_user_message(chat_id, last_at) VALUES(?, ?) "
-                    "ON CONFLICT(chat_id) DO UPDATE SET last_at=excluded.last_at",
-                    (chat_id, ts),
-                )
-                await db.commit()
+        async with self._write() as db:
+            await db.execute(
+                "INSERT INTO chat_last_user_message(chat_id, last_at) VALUES(?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET last_at=excluded.last_at",
+                (chat_id, ts),
+            )
+            await db.commit()
 
     async def add_template(self, content: str) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                created_at = int(time.time())
-                cur = await db.execute(
-                    "INSERT INTO templates(content, created_at) VALUES(?, ?)",
-                    (content, created_at),
-                )
-                await db.commit()
-                return int(cur.lastrowid)
+        async with self._write() as db:
+            created_at = int(time.time())
+            cur = await db.execute(
+                "INSERT INTO templates(content, created_at) VALUES(?, ?)",
+                (content, created_at),
+            )
+            await db.commit()
+            return int(cur.lastrowid)
 
     async def delete_template(self, template_id: int) -> bool:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("DELETE FROM templates WHERE id=?", (template_id,))
-                await db.commit()
-                return cur.rowcount > 0
+        async with self._write() as db:
+            cur = await db.execute("DELETE FROM templates WHERE id=?", (template_id,))
+            await db.commit()
+            return cur.rowcount > 0
 
     async def list_templates(self, offset: int = 0, limit: int = 10) -> list[dict[str, Any]]:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                db.row_factory = aiosqlite.Row
-                cur = await db.execute(
-                    "SELECT id, content, created_at FROM templates ORDER BY id DESC LIMIT ? OFFSET ?",
-                    (limit, offset),
-                )
-                rows = await cur.fetchall()
-                await cur.close()
-                return [dict(r) for r in rows]
+        async with self._read() as db:
+            cur = await db.execute(
+                "SELECT id, content, created_at FROM templates ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            )
+            rows = await cur.fetchall()
+            await cur.close()
+            return [dict(r) for r in rows]
 
     async def count_templates(self) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT COUNT(*) FROM templates")
-                row = await cur.fetchone()
-                await cur.close()
-                return int(row[0]) if row else 0
+        async with self._read() as db:
+            cur = await db.execute("SELECT COUNT(*) FROM templates")
+            row = await cur.fetchone()
+            await cur.close()
+            return int(row[0]) if row else 0
 
     async def get_template(self, template_id: int) -> dict[str, Any] | None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                db.row_factory = aiosqlite.Row
-                cur = await db.execute(
-                    "SELECT id, content, created_at FROM templates WHERE id=?",
-                    (template_id,),
-                )
-                row = await cur.fetchone()
-                await cur.close()
-                return dict(row) if row else None
+        async with self._read() as db:
+            cur = await db.execute(
+                "SELECT id, content, created_at FROM templates WHERE id=?",
+                (template_id,),
+            )
+            row = await cur.fetchone()
+            await cur.close()
+            return dict(row) if row else None
 
     async def is_order_notified(self, order_id: str) -> bool:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT 1 FROM orders_notified WHERE order_id=?", (order_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                return row is not None
+        async with self._read() as db:
+            cur = await db.execute("SELECT 1 FROM orders_notified WHERE order_id=?", (order_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            return row is not None
 
     async def mark_order_notified(self, order_id: str) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                created_at = int(time.time())
-                await db.execute(
-                    "INSERT INTO orders_notified(order_id, created_at) VALUES(?, ?) ON CONFLICT(order_id) DO NOTHING",
-                    (order_id, created_at),
-                )
-                await db.commit()
+        async with self._write() as db:
+            created_at = int(time.time())
+            await db.execute(
+                "INSERT INTO orders_notified(order_id, created_at) VALUES(?, ?) ON CONFLICT(order_id) DO NOTHING",
+                (order_id, created_at),
+            )
+            await db.commit()
 
     async def get_order_status(self, order_id: str) -> str | None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT last_status FROM orders_status WHERE order_id=?", (order_id,))
-                row = await cur.fetchone()
-                await cur.close()
-                return str(row[0]) if row and row[0] is not None else None
+        async with self._read() as db:
+            cur = await db.execute("SELECT last_status FROM orders_status WHERE order_id=?", (order_id,))
+            row = await cur.fetchone()
+            await cur.close()
+            return str(row[0]) if row and row[0] is not None else None
 
     async def set_order_status(self, order_id: str, status: str) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                ts = int(time.time())
-                await db.execute(
+        async with self._write() as db:
+            ts = int(time.time())
+            await db.execute(
+                "INSERT INTO orders_status(order_id, last_status, updated_at) VALUES(?, ?, ?) "
+                "ON CONFLICT(order_id) DO UPDATE SET last_status=excluded.last_status, updated_at=excluded.updated_at",
+                (order_id, status, ts),
+            )
+            await db.commit()
+
+    async def get_notified_orders(self, order_ids: list[str]) -> set[str]:
+        found: set[str] = set()
+        if not order_ids:
+            return found
+        async with self._read() as db:
+            for chunk in _chunks(order_ids):
+                marks = ",".join("?" * len(chunk))
+                cur = await db.execute(f"SELECT order_id FROM orders_notified WHERE order_id IN ({marks})", chunk)
+                found.update(str(r[0]) for r in await cur.fetchall())
+                await cur.close()
+        return found
+
+    async def get_order_statuses(self, order_ids: list[str]) -> dict[str, str]:
+        statuses: dict[str, str] = {}
+        if not order_ids:
+            return statuses
+        async with self._read() as db:
+            for chunk in _chunks(order_ids):
+                marks = ",".join("?" * len(chunk))
+                cur = await db.execute(
+                    f"SELECT order_id, last_status FROM orders_status WHERE order_id IN ({marks})", chunk
+                )
+                for r in await cur.fetchall():
+                    if r[1] is not None:
+                        statuses[str(r[0])] = str(r[1])
+                await cur.close()
+        return statuses
+
+    async def apply_order_updates(
+        self,
+        statuses: dict[str, str],
+        history: list[tuple[str, str, int | None, int]] | None = None,
+    ) -> None:
+        if not statuses and not history:
+            return
+        ts = int(time.time())
+        async with self._write() as db:
+            if history:
+                await db.executemany(_UPSERT_ORDER_SQL, [(*row, ts) for row in history])
+            if statuses:
+                await db.executemany(
                     "INSERT INTO orders_status(order_id, last_status, updated_at) VALUES(?, ?, ?) "
                     "ON CONFLICT(order_id) DO UPDATE SET last_status=excluded.last_status, updated_at=excluded.updated_at",
-                    (order_id, status, ts),
+                    [(oid, status, ts) for oid, status in statuses.items()],
                 )
-                await db.commit()
+            await db.commit()
 
-    async def has_digest_sent(self, key: str) -> bool:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT 1 FROM digest_sent WHERE key=?", (key,))
-                row = await cur.fetchone()
+    async def upsert_orders(self, rows: list[tuple[str, str, int | None, int]]) -> None:
+        if not rows:
+            return
+        ts = int(time.time())
+        async with self._write() as db:
+            await db.executemany(_UPSERT_ORDER_SQL, [(*row, ts) for row in rows])
+            await db.commit()
+
+    async def get_order_history_statuses(self, order_ids: list[str]) -> dict[str, str]:
+        statuses: dict[str, str] = {}
+        if not order_ids:
+            return statuses
+        async with self._read() as db:
+            for chunk in _chunks(order_ids):
+                marks = ",".join("?" * len(chunk))
+                cur = await db.execute(f"SELECT order_id, status FROM orders WHERE order_id IN ({marks})", chunk)
+                for r in await cur.fetchall():
+                    statuses[str(r[0])] = str(r[1] or "")
+                await cur.close()
+        return statuses
+
+    async def order_backfill_marks(
+        self,
+        final_statuses: tuple[str, ...] = ("COMPLETED", "REFUND"),
+        limit: int = 200,
+    ) -> tuple[int | None, set[str]]:
+        marks = ",".join("?" * len(final_statuses))
+        async with self._read() as db:
+            cur = await db.execute(
+                f"SELECT MIN(created_at) FROM orders WHERE created_at IS NOT NULL AND status NOT IN ({marks})",
+                final_statuses,
+            )
+            row = await cur.fetchone()
+            await cur.close()
+            if row and row[0] is not None:
+                return int(row[0]), set()
+            cur = await db.execute("SELECT MAX(created_at) FROM orders")
+            row = await cur.fetchone()
+            await cur.close()
+            newest = int(row[0]) if row and row[0] is not None else None
+            cur = await db.execute(
+                f"SELECT order_id FROM orders WHERE status IN ({marks}) ORDER BY created_at DESC LIMIT ?",
+                (*final_statuses, int(limit)),
+            )
+            known = {str(r[0]) for r in await cur.fetchall()}
+            await cur.close()
+            return newest, known
+
+    async def count_orders(self) -> int:
+        async with self._read() as db:
+            cur = await db.execute("SELECT COUNT(*) FROM orders")
+            row = await cur.fetchone()
+            await cur.close()
+            return int(row[0]) if row else 0
+
+    async def _rebuild_order_buckets(self, db) -> None:
+        await db.execute("DELETE FROM order_buckets")
+        for g, size in _BUCKET_SIZES.items():
+            await db.execute(
+                f"INSERT INTO order_buckets(granularity, bucket, status, count, total) "
+                f"SELECT '{g}', created_at / {size} * {size}, status, COUNT(*), COALESCE(SUM(price), 0) "
+                f"FROM orders WHERE created_at IS NOT NULL GROUP BY 2, 3"
+            )
+
+    async def rebuild_order_buckets(self) -> None:
+        async with self._write() as db:
+            await self._rebuild_order_buckets(db)
+            await db.commit()
+
+    async def order_stats(
+        self,
+        since: int,
+        until: int | None = None,
+        statuses: tuple[str, ...] = ("COMPLETED", "REFUND", "CREATED"),
+    ) -> dict[str, tuple[int, int]]:
+        until = int(time.time()) + BUCKET_HOUR if until is None else int(until)
+        h0 = max(0, int(since)) // BUCKET_HOUR * BUCKET_HOUR
+        h1 = -(-until // BUCKET_HOUR) * BUCKET_HOUR
+        d0 = -(-h0 // BUCKET_DAY) * BUCKET_DAY
+        d1 = h1 // BUCKET_DAY * BUCKET_DAY
+        if d0 >= d1:
+            d0 = d1 = h1
+        marks = ",".join("?" * len(statuses))
+        async with self._read() as db:
+            cur = await db.execute(
+                f"SELECT status, SUM(count), SUM(total) FROM order_buckets WHERE status IN ({marks}) AND ("
+                f"(granularity='d' AND bucket >= ? AND bucket < ?) OR "
+                f"(granularity='h' AND ((bucket >= ? AND bucket < ?) OR (bucket >= ? AND bucket < ?)))"
+                f") GROUP BY status",
+                (*statuses, d0, d1, h0, d0, d1, h1),
+            )
+            rows = await cur.fetchall()
+            await cur.close()
+            cur = await db.execute(
+                f"SELECT status, COUNT(*), COALESCE(SUM(price), 0) FROM orders WHERE status IN ({marks}) AND ("
+                f"(created_at >= ? AND created_at < ?) OR (created_at >= ? AND created_at < ?)"
+                f") GROUP BY status",
+                (*statuses, h0, max(h0, int(since)), max(h0, until), h1),
+            )
+            edges = await cur.fetchall()
+            await cur.close()
+        out = {s: (0, 0) for s in statuses}
+        for r in rows:
+            out[str(r[0])] = (int(r[1] or 0), int(r[2] or 0))
+        for r in edges:
+            cnt, total = out.get(str(r[0]), (0, 0))
+            out[str(r[0])] = (max(0, cnt - int(r[1] or 0)), total - int(r[2] or 0))
+        return out
+
+    async def get_meta(self, key: str) -> str | None:
+        async with self._read() as db:
+            cur = await db.execute("SELECT value FROM meta WHERE key=?", (key,))
+            row = await cur.fetchone()
+            await cur.close()
+            return row[0] if row else None
+
+    async def set_meta(self, key: str, value: str) -> None:
+        async with self._write() as db:
+            await db.execute(
+                "INSERT INTO meta(key, value) VALUES(?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (key, value),
+            )
+            await db.commit()
+
+    async def get_offer_meta(self, offer_ids: list[int], max_age: int | None = None) -> dict[int, dict[str, Any]]:
+        found: dict[int, dict[str, Any]] = {}
+        if not offer_ids:
+            return found
+        min_ts = int(time.time()) - int(max_age) if max_age else 0
+        async with self._read() as db:
+            for chunk in _chunks(offer_ids):
+                marks = ",".join("?" * len(chunk))
+                cur = await db.execute(
+                    f"SELECT offer_id, game_id, category_id, game_slug, category_slug FROM offer_meta "
+                    f"WHERE offer_id IN ({marks}) AND updated_at >= ?",
+                    (*chunk, min_ts),
+                )
+                for r in await cur.fetchall():
+                    found[int(r[0])] = {
+                        "game_id": r[1],
+                        "category_id": r[2],
+                        "game_slug": r[3],
+                        "category_slug": r[4],
+                    }
                 await cur.close()
-                return row is not None
+        return found
+
+    async def set_offer_meta(self, rows: list[tuple[int, int | None, int | None, str | None, str | None]]) -> None:
+        if not rows:
+            return
+        ts = int(time.time())
+        async with self._write() as db:
+            await db.executemany(
+                "INSERT INTO offer_meta(offer_id, game_id, category_id, game_slug, category_slug, updated_at) "
+                "VALUES(?, ?, ?, ?, ?, ?) ON CONFLICT(offer_id) DO UPDATE SET game_id=excluded.game_id, "
+                "category_id=excluded.category_id, game_slug=excluded.game_slug, "
+                "category_slug=excluded.category_slug, updated_at=excluded.updated_at",
+                [(*row, ts) for row in rows],
+            )
+            await db.commit()
+
+    async def prune_offer_meta(self, keep_ids: list[int]) -> int:
+        async with self._write() as db:
+            if keep_ids:
+                await db.execute("CREATE TEMP TABLE IF NOT EXISTS offer_meta_keep (offer_id INTEGER PRIMARY KEY)")
+                await db.execute("DELETE FROM offer_meta_keep")
+                await db.executemany("INSERT OR IGNORE INTO offer_meta_keep(offer_id) VALUES(?)", [(i,) for i in keep_ids])
+                cur = await db.execute("DELETE FROM offer_meta WHERE offer_id NOT IN (SELECT offer_id FROM offer_meta_keep)")
+                await db.execute("DELETE FROM offer_meta_keep")
+            else:
+                cur = await db.execute("DELETE FROM offer_meta")
+            removed = cur.rowcount or 0
+            await cur.close()
+            await db.commit()
+            return removed
+
+    async def has_digest_sent(self, key: str) -> bool:
+        async with self._read() as db:
+            cur = await db.execute("SELECT 1 FROM digest_sent WHERE key=?", (key,))
+            row = await cur.fetchone()
+            await cur.close()
+            return row is not None
 
     async def mark_digest_sent(self, key: str) -> None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                created_at = int(time.time())
-                await db.execute(
-                    "INSERT INTO digest_sent(key, created_at) VALUES(?, ?) ON CONFLICT(key) DO NOTHING",
-                    (key, created_at),
-                )
-                await db.commit()
+        async with self._write() as db:
+            created_at = int(time.time())
+            await db.execute(
+                "INSERT INTO digest_sent(key, created_at) VALUES(?, ?) ON CONFLICT(key) DO NOTHING",
+                (key, created_at),
+            )
+            await db.commit()
 
     async def add_autodelivery_items(self, product: str, values: list[str]) -> int:
         if not values:
             return 0
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                created_at = int(time.time())
-                await db.executemany(
-                    "INSERT INTO autodelivery_items(product, value, created_at) VALUES(?, ?, ?)",
-                    [(product, v, created_at) for v in values],
-                )
-                await db.commit()
-                return len(values)
+        async with self._write() as db:
+            created_at = int(time.time())
+            await db.executemany(
+                "INSERT INTO autodelivery_items(product, value, created_at) VALUES(?, ?, ?)",
+                [(product, v, created_at) for v in values],
+            )
+            await db.commit()
+            return len(values)
 
     async def pop_autodelivery_item(self, product: str) -> str | None:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                db.row_factory = aiosqlite.Row
-                cur = await db.execute(
-                    "SELECT id, value FROM autodelivery_items WHERE product=? ORDER BY id ASC LIMIT 1",
-                    (product,),
-                )
+        items = await self.pop_autodelivery_items(product, 1)
+        return items[0] if items else None
+
+    async def add_autodelivery_counts(self, product: str, rows: list[tuple[str, int]]) -> int:
+        rows = [(v, int(c)) for v, c in rows if v and int(c) > 0]
+        if not rows:
+            return 0
+        async with self._write() as db:
+            created_at = int(time.time())
+            await db.executemany(
+                "INSERT INTO autodelivery_items(product, value, count, created_at) VALUES(?, ?, ?, ?)",
+                [(product, v, c, created_at) for v, c in rows],
+            )
+            await db.commit()
+            return sum(c for _v, c in rows)
+
+    async def pop_autodelivery_items(self, product: str, n: int, order_id: str | None = None) -> list[str]:
+        n = int(n)
+        if n <= 0:
+            return []
+        out: list[str] = []
+        async with self._write() as db:
+            await db.execute("BEGIN IMMEDIATE")
+            if order_id:
+                cur = await db.execute("SELECT 1 FROM orders_notified WHERE order_id=?", (order_id,))
                 row = await cur.fetchone()
                 await cur.close()
-                if not row:
-                    return None
-                item_id = int(row["id"]) if "id" in row.keys() else int(row[0])
-                value = str(row["value"]) if "value" in row.keys() else str(row[1])
-                await db.execute("DELETE FROM autodelivery_items WHERE id=?", (item_id,))
-                await db.commit()
-                return value
+                if row is not None:
+                    await db.commit()
+                    return out
+            cur = await db.execute(
+                "SELECT id, value, count FROM autodelivery_items WHERE product=? ORDER BY id ASC LIMIT ?",
+                (product, n),
+            )
+            rows = await cur.fetchall()
+            await cur.close()
+            consumed: list[int] = []
+            for row in rows:
+                remaining = n - len(out)
+                if remaining <= 0:
+                    break
+                item_id, value, count = int(row[0]), str(row[1]), max(1, int(row[2] or 1))
+                take = min(count, remaining)
+                out.extend([value] * take)
+                if take == count:
+                    consumed.append(item_id)
+                else:
+                    await db.execute("UPDATE autodelivery_items SET count=count-? WHERE id=?", (take, item_id))
+            if consumed:
+                marks = ",".join("?" * len(consumed))
+                await db.execute(f"DELETE FROM autodelivery_items WHERE id IN ({marks})", consumed)
+            if order_id and out:
+                await db.execute(
+                    "INSERT INTO orders_notified(order_id, created_at) VALUES(?, ?) ON CONFLICT(order_id) DO NOTHING",
+                    (order_id, int(time.time())),
+                )
+            await db.commit()
+        return out
 
     async def count_autodelivery(self, product: str) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT COUNT(*) FROM autodelivery_items WHERE product=?", (product,))
-                row = await cur.fetchone()
-                await cur.close()
-                return int(row[0]) if row else 0
+        async with self._read() as db:
+            cur = await db.execute("SELECT COALESCE(SUM(count), 0) FROM autodelivery_items WHERE product=?", (product,))
+            row = await cur.fetchone()
+            await cur.close()
+            return int(row[0]) if row else 0
 
     async def list_autodelivery_products(self) -> list[tuple[str, int]]:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT product, COUNT(*) AS cnt FROM autodelivery_items GROUP BY product ORDER BY product ASC")
-                rows = await cur.fetchall()
-                await cur.close()
-                return [(str(r[0]), int(r[1])) for r in rows]
+        async with self._read() as db:
+            cur = await db.execute("SELECT product, SUM(count) AS cnt FROM autodelivery_items GROUP BY product ORDER BY product ASC")
+            rows = await cur.fetchall()
+            await cur.close()
+            return [(str(r[0]), int(r[1])) for r in rows]
 
     async def delete_autodelivery_product(self, product: str) -> int:
-        async with self._lock:
-            async with aiosqlite.connect(self.path) as db:
-                cur = await db.execute("SELECT COUNT(*) FROM autodelivery_items WHERE product=?", (product,))
-                row = await cur.fetchone()
-                to_del = int(row[0]) if row else 0
-                await cur.close()
-                await db.execute("DELETE FROM autodelivery_items WHERE product=?", (product,))
-                await db.commit()
-                return to_del
+        async with self._write() as db:
+            cur = await db.execute("SELECT COALESCE(SUM(count), 0) FROM autodelivery_items WHERE product=?", (product,))
+            row = await cur.fetchone()
+            to_del = int(row[0]) if row else 0
+            await cur.close()
+            await db.execute("DELETE FROM autodelivery_items WHERE product=?", (product,))
+            await db.commit()
+            return to_del
 
 
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any
+
+import aiohttp
+
+
+_session: aiohttp.ClientSession | None = None
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session, _loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=4, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+        _loop = loop
+    return _session
+
+
+async def get_json(url: str, headers: dict | None = None, timeout: float = 10) -> tuple[int, Any]:
+    async with _get_session().get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        if resp.status != 200:
+            return resp.status, None
+        return resp.status, await resp.json(content_type=None)
+
+
+async def get_text(url: str, headers: dict | None = None, timeout: float = 10) -> tuple[int, str | None]:
+    async with _get_session().get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+        if resp.status != 200:
+            return resp.status, None
+        return resp.status, await resp.text()
+
+
+async def close_session() -> None:
+    global _session, _loop
+    session = _session
+    _session = None
+    _loop = None
+    if session is not None and not session.closed:
+        await session.close()
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+
+class LoopWatchdog:
+    def __init__(self, threshold_ms: float = 100, sample_interval: float = 0.1, debug: bool = False) -> None:
+        self.threshold = max(1.0, float(threshold_ms)) / 1000.0
+        self.sample_interval = float(sample_interval)
+        self.debug = bool(debug)
+        self.max_lag_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.blocked = 0
+        self._task: asyncio.Task | None = None
+        self._log = logging.getLogger("exfador.loop")
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.sample_interval
+            await asyncio.sleep(self.sample_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.last_lag_ms = lag * 1000
+            self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+            if lag >= self.threshold:
+                self.blocked += 1
+                self._log.warning("loop_blocked lag_ms=%d", int(self.last_lag_ms))
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.debug:
+            loop.slow_callback_duration = self.threshold
+            loop.set_debug(True)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._sample())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "threshold_ms": int(self.threshold * 1000),
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "blocked": self.blocked,
+        }
+
+
+_watchdog: LoopWatchdog | None = None
+
+
+def start_loop_watchdog(threshold_ms: float = 100, debug: bool = False) -> LoopWatchdog:
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = LoopWatchdog(threshold_ms=threshold_ms, debug=debug)
+    _watchdog.start()
+    return _watchdog
+
+
+def loop_watchdog_metrics() -> dict:
+    return _watchdog.metrics() if _watchdog is not None else {}
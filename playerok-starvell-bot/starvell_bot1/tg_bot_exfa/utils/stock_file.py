@@ -0,0 +1,33 @@
+from typing import Iterator
+
+
+def parse_stock_line(line: str) -> tuple[str, int] | None:
+    s = (line or "").strip()
+    if not s:
+        return None
+    if ":" not in s:
+        return s, 1
+    left, right = s.split(":", 1)
+    left = left.strip()
+    try:
+        count = int((right or "").strip())
+    except Exception:
+        count = 1
+    if not left or count <= 0:
+        return None
+    return left, count
+
+
+def iter_stock_chunks(path: str, chunk_rows: int = 5000) -> Iterator[tuple[list[tuple[str, int]], int]]:
+    chunk: list[tuple[str, int]] = []
+    with open(path, "rb") as f:
+        for raw in f:
+            parsed = parse_stock_line(raw.decode("utf-8", errors="ignore"))
+            if parsed is None:
+                continue
+            chunk.append(parsed)
+            if len(chunk) >= chunk_rows:
+                yield chunk, f.tell()
+                chunk = []
+        if chunk:
+            yield chunk, f.tell()